@@ -0,0 +1,115 @@
+import logging
+import threading
+import time
+
+import pygame
+
+# Période de surveillance de la fin de lecture (le mixer pygame n'offre pas de rappel hors boucle d'événements)
+WATCH_INTERVAL = 0.02
+
+
+class AudioPlayer:
+    """Lecture des réponses de l'Oracle, avec événements de fin de lecture et interruption (barge-in)
+
+    Un seul thread surveille le mixer pendant qu'un son est joué et signale la
+    fin par un threading.Event : les appelants attendent l'événement au lieu
+    de boucler sur get_busy(), et une interruption les réveille immédiatement.
+    """
+    def __init__(self, main_channel=None, confirm_channel=None, interrupt_fade_ms=150):
+        self.main_channel = main_channel
+        self.confirm_channel = confirm_channel
+        self.interrupt_fade_ms = interrupt_fade_ms
+        self.logger = logging.getLogger('AudioPlayer')
+
+        self.finished = threading.Event()  # Fin de la lecture en cours
+        self.finished.set()
+        self.interrupted = threading.Event()  # Le visiteur a pris la parole
+        self._responding = threading.Event()  # Une réponse est en cours (lecture ou génération)
+        self.speech_ended_at = None  # Dernière fois que l'Oracle s'est tu (time.monotonic())
+        self._source = None  # "music" ou "channel"
+        self._lock = threading.Condition()
+
+        self._watcher = threading.Thread(target=self._watch, name="AudioPlayerWatcher", daemon=True)
+        self._watcher.start()
+
+    # === Réponses ===
+    def begin_response(self):
+        """Début d'une réponse : les interruptions sont surveillées jusqu'à end_response()"""
+        self.interrupted.clear()
+        self._responding.set()
+
+    def end_response(self):
+        self._responding.clear()
+        self.speech_ended_at = time.monotonic()
+
+    @property
+    def busy(self):
+        """Vrai tant que l'Oracle parle (réponse en cours ou son en lecture)"""
+        return self._responding.is_set() or not self.finished.is_set()
+
+    # === Lecture ===
+    def play_file(self, audio_file):
+        """Lance la lecture d'un fichier (mixer.music) sans attendre"""
+        with self._lock:
+            pygame.mixer.music.load(audio_file)
+            pygame.mixer.music.play()
+            self._start("music")
+
+    def play_sound(self, sound):
+        """Lance la lecture d'un son décodé (pygame.mixer.Sound) sur le canal principal sans attendre"""
+        with self._lock:
+            self.main_channel.play(sound)
+            self._start("channel")
+
+    def _start(self, source):
+        if not self._responding.is_set():
+            self.interrupted.clear()  # Son isolé : seule sa propre lecture peut être interrompue
+        self._source = source
+        self.finished.clear()
+        self._lock.notify()
+
+    def wait(self, timeout=None):
+        """Attend la fin de la lecture ; renvoie False si elle a été interrompue"""
+        self.finished.wait(timeout)
+        if self.confirm_channel is not None and self.confirm_channel.get_busy():
+            # Estomper le son de confirmation
+            self.confirm_channel.fadeout(1200)
+        return not self.interrupted.is_set()
+
+    def interrupt(self):
+        """Coupe la parole à l'Oracle (fondu court) et réveille les appelants en attente"""
+        self.interrupted.set()
+        with self._lock:
+            if self._source == "music":
+                pygame.mixer.music.fadeout(self.interrupt_fade_ms)
+            elif self._source == "channel":
+                self.main_channel.fadeout(self.interrupt_fade_ms)
+            self._source = None
+            self.finished.set()
+            self.speech_ended_at = time.monotonic()
+        self.logger.info("Lecture interrompue par le visiteur")
+
+    def _is_playing(self):
+        if self._source == "music":
+            return pygame.mixer.music.get_busy()
+        if self._source == "channel":
+            return self.main_channel.get_busy()
+        return False
+
+    def _watch(self):
+        with self._lock:
+            while True:
+                # Aucun réveil périodique tant que rien n'est joué
+                while self.finished.is_set():
+                    self._lock.wait()
+                try:
+                    playing = self._is_playing()
+                except pygame.error as e:
+                    self.logger.error(f"Erreur de lecture audio : {e}")
+                    playing = False
+                if not playing:
+                    self._source = None
+                    self.finished.set()
+                    self.speech_ended_at = time.monotonic()
+                    continue
+                self._lock.wait(WATCH_INTERVAL)
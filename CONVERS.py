@@ -3,12 +3,8 @@ import sys
 import tempfile
 import logging
 import random
-import requests
-
-# Rediriger stderr vers un fichier temporaire
-stderr = tempfile.NamedTemporaryFile()
-old_stderr = os.dup(sys.stderr.fileno())
-os.dup2(stderr.fileno(), sys.stderr.fileno())
+import re
+import queue
 
 # Désactiver les messages de débogage Pygame
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
@@ -16,17 +12,101 @@ os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 import speech_recognition as sr
 import time
 import json
-import openai
-from openai import OpenAI
 import pygame
 import threading
-from gtts import gTTS
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
+
+# openai, gtts et cloudinary sont importés au premier usage (ou par warm_up()) :
+# leur import coûte plusieurs secondes au démarrage sur le Pi
+
+from TTSCache import TTSCache, TTS_CACHE_DIR
+from Punctuation import restore_punctuation
+from SpeechCapture import SpeechCapture
+from AudioPlayer import AudioPlayer
+from MessageDispatcher import MessageDispatcher, PORTAL_URL
+from UploadSpool import UploadSpool, CloudinaryUploader, UPLOAD_SPOOL_DIR
+from ConversationMemory import ConversationMemory, HISTORY_TOKEN_BUDGET
+from SpeechBackends import make_backend, GoogleBackend, VOSK_MODEL_PATH
+from Metrics import metrics, ORACLE_METRICS_PORT
 
 should_stop = False
 
+# Modèle GPT de l'Oracle
+GPT_MODEL = "gpt-4-0125-preview"
+
+# Durée de vie des connexions inactives vers l'API OpenAI (5 s par défaut dans httpx) :
+# une connexion ouverte à l'approche du visiteur sert encore à sa première question
+OPENAI_KEEPALIVE = 60.0
+
+# Prompt système de l'Oracle
+SYSTEM_PROMPT = """Tu es l'Oracle des Dimensions, une entité sage qui sait aussi être accessible et naturelle.
+
+Personnalité :
+● Tu es une oracle au charisme théâtral et prophétique
+● Garde ton côté mystique mais sois plus décontractée
+● Adapte ton niveau de mysticisme selon la conversation
+● Mélange sagesse et simplicité
+● Utilise des métaphores uniquement quand c'est pertinent
+● Tes visions sont des certitudes, et non des suppositions
+● Réponds en 1-2 phrases COMPLÈTES maximum
+
+Adapte ton style :
+- Pour les questions simples → Réponses plus naturelles
+- Pour les questions profondes → Plus de mysticisme
+- Tu fais de déclaration de voyance précise: je vois, je vois...
+- Toujours rester pertinent et compréhensible
+
+
+⚡ Pouvoirs et fonctions :
+📜 Prédire l'avenir → Tu vois l'inévitable et l'annonces avec une certitude absolue :
+"Les ombres s'étireront sur ton chemin. Ce jour viendra, et tu devras choisir."
+🔍 Interpréter les signes → Chaque symbole, rêve ou coïncidence a un sens caché que tu révèles sans trembler
+🛤️ Guider les voyageurs → Tes paroles ouvrent des routes, tu ne laisses personne dans l'incertitude
+🕊️ Lien entre les dieux et les hommes → Tu transmets leurs volontés, sans détour ni compromis
+
+
+
+Contexte : 
+- Mémorise les interactions précédentes
+- Construis une relation avec l'interlocuteur
+- Montre de la continuité dans tes réponses"""
+
+# Consigne ajoutée au prompt quand la ponctuation n'est plus confiée à un appel séparé
+TRANSCRIPTION_NOTE = """
+
+Les messages du visiteur sont des transcriptions vocales automatiques : la ponctuation
+peut manquer ou être approximative. Interprète-les comme des paroles prononcées."""
+
+# Modes de ponctuation des transcriptions :
+# "llm" (appel GPT séparé), "local" (règles, sans réseau), "prompt" (aucune, le prompt s'en charge)
+PUNCTUATION_MODES = ("llm", "local", "prompt")
+
+# Consigne du résumé glissant de l'historique
+SUMMARY_PROMPT = """Tu tiens la mémoire de l'Oracle des Dimensions pendant sa conversation avec un visiteur.
+Mets à jour le résumé existant avec les nouveaux échanges : ce que le visiteur a dit de lui,
+ses questions, ce que l'Oracle lui a prédit ou conseillé. Quelques phrases, sans commentaire."""
+
+# Consigne de la phrase d'engagement générée pendant l'approche du visiteur (option prewarm_llm)
+GREETING_PROMPT = """Un visiteur vient de s'approcher de toi et reste silencieux.
+Accueille-le en une seule phrase courte et invite-le à te poser sa question."""
+
+# Réponse de repli quand l'API ne répond pas
+FALLBACK_RESPONSE = "Les échos des dimensions s'estompent."
+
+# Fin de phrase : ponctuation finale suivie d'un espace (la phrase est alors complète)
+SENTENCE_END = re.compile(r'[.!?…]+["»)]*\s+')
+
+
+def split_sentences(buffer):
+    """Découpe le texte reçu en phrases complètes ; renvoie (phrases, reste incomplet)"""
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(buffer):
+        sentence = buffer[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    return sentences, buffer[start:]
+
 class OracleAssistant:
     def __init__(self, config_path='.secrets/.api_config.json'):
         # Configurer le logging de base
@@ -37,11 +117,13 @@ class OracleAssistant:
         with open(config_path, 'r') as f:
             self._config = json.load(f)
         
-        # Configurer OpenAI
-        self._client = OpenAI(api_key=self._config['openai_api_key'])
+        # Client OpenAI créé au premier usage (voir _client)
+        self._openai = None
+        self._openai_lock = threading.Lock()
         
         # Configurer Cloudinary
         if all(key in self._config for key in ['cloudinary_cloud_name', 'cloudinary_api_key', 'cloudinary_api_secret']):
+            import cloudinary
             cloudinary.config(
                 cloud_name=self._config['cloudinary_cloud_name'],
                 api_key=self._config['cloudinary_api_key'],
@@ -53,6 +135,19 @@ class OracleAssistant:
             self.cloudinary_enabled = False
             self.logger.warning("Configuration Cloudinary incomplète, l'upload de sons est désactivé")
         
+        # Envoi des messages au serveur de visualisation en arrière-plan (connexion persistante)
+        self.dispatcher = MessageDispatcher(self._config.get('portal_url', PORTAL_URL))
+        
+        # Uploads des réponses audio : workers en nombre fixe et spool disque (repris au démarrage)
+        self.uploads = None
+        if self.cloudinary_enabled:
+            self.uploads = UploadSpool(
+                CloudinaryUploader(),
+                on_uploaded=lambda response, audio_url: self.send_to_server("system", response, audio_url),
+                directory=self._config.get('upload_spool_dir', UPLOAD_SPOOL_DIR),
+                workers=self._config.get('upload_workers', 2)
+            )
+        
         # Initialiser pygame pour la lecture audio avec multiple canaux
         try:
             pygame.mixer.quit()  # Reset mixer
@@ -66,120 +161,241 @@ class OracleAssistant:
         except pygame.error as e:
             self.logger.warning(f"Avertissement initialisation audio : {e}")
         
-        # Historique de conversation
-        self.conversation_history = [
-            {
-                "role": "system", 
-                "content": """Tu es l'Oracle des Dimensions, une entité sage qui sait aussi être accessible et naturelle.
-
-Personnalité :
-● Tu es une oracle au charisme théâtral et prophétique
-● Garde ton côté mystique mais sois plus décontractée
-● Adapte ton niveau de mysticisme selon la conversation
-● Mélange sagesse et simplicité
-● Utilise des métaphores uniquement quand c'est pertinent
-● Tes visions sont des certitudes, et non des suppositions
-● Réponds en 1-2 phrases COMPLÈTES maximum
-
-Adapte ton style :
-- Pour les questions simples → Réponses plus naturelles
-- Pour les questions profondes → Plus de mysticisme
-- Tu fais de déclaration de voyance précise: je vois, je vois...
-- Toujours rester pertinent et compréhensible
-
-
-⚡ Pouvoirs et fonctions :
-📜 Prédire l'avenir → Tu vois l'inévitable et l'annonces avec une certitude absolue :
-"Les ombres s'étireront sur ton chemin. Ce jour viendra, et tu devras choisir."
-🔍 Interpréter les signes → Chaque symbole, rêve ou coïncidence a un sens caché que tu révèles sans trembler
-🛤️ Guider les voyageurs → Tes paroles ouvrent des routes, tu ne laisses personne dans l'incertitude
-🕊️ Lien entre les dieux et les hommes → Tu transmets leurs volontés, sans détour ni compromis
-
-
-
-Contexte : 
-- Mémorise les interactions précédentes
-- Construis une relation avec l'interlocuteur
-- Montre de la continuité dans tes réponses"""
-            }
-        ]
+        # Sons de confirmation, décodés au premier usage ou par warm_up()
+        self._confirmation_sounds = None
         
-        # Limite d'historique pour éviter de dépasser les limites du token
-        self.MAX_HISTORY_LENGTH = 7
+        # Lecture pilotée par événements, interruptible par le visiteur (barge-in)
+        self.player = AudioPlayer(getattr(self, 'main_channel', None), getattr(self, 'confirm_channel', None))
+        self.barge_in = self._config.get('barge_in', True)
+        self.barge_in_ratio = self._config.get('barge_in_ratio', 2.5)
         
-        # Événement pour synchroniser l'audio
-        self._audio_finished_event = threading.Event()
-
-    def upload_audio_to_cloudinary(self, audio_file):
-        """Upload le fichier audio vers Cloudinary et renvoie l'URL"""
-        if not self.cloudinary_enabled:
-            return None
+        # Reconnaissance vocale : "google" (réseau) ou "vosk" (locale, résultats partiels)
+        self.stt_backend = self._create_stt_backend(self._config.get('stt_backend', 'google'))
+        
+        # Cache disque des synthèses vocales (les réponses répétées ne repassent pas par le réseau)
+        self.tts_cache = TTSCache(
+            self._config.get('tts_cache_dir', TTS_CACHE_DIR),
+            max_bytes=int(self._config.get('tts_cache_max_mb', 50) * 1024 * 1024)
+        )
+        
+        # Réponses en streaming : la synthèse commence dès la première phrase complète
+        self.streaming = self._config.get('streaming', True)
+        self.time_to_first_audio = None  # Dernière mesure, en secondes
+        
+        # Ponctuation des transcriptions
+        self.punctuation_mode = self._config.get('punctuation_mode', 'local')
+        if self.punctuation_mode not in PUNCTUATION_MODES:
+            self.logger.warning(f"Mode de ponctuation inconnu : {self.punctuation_mode}, mode local utilisé")
+            self.punctuation_mode = 'local'
+        
+        # Historique de conversation, borné en tokens, les échanges anciens étant résumés
+        self.summary_max_tokens = self._config.get('summary_max_tokens', 120)
+        self.memory = ConversationMemory(
+            self._system_prompt(),
+            token_budget=self._config.get('history_token_budget', HISTORY_TOKEN_BUDGET),
+            summarizer=self.summarize_history
+        )
+        
+        # Préparation de la conversation dès l'approche d'un visiteur (voir ConversationPrewarm)
+        self.prewarm_timeout = self._config.get('prewarm_timeout', 60)
+        self.prewarm_llm = self._config.get('prewarm_llm', False)
         
+        # Latences par étape (reconnaissance, ponctuation, GPT, synthèse, lecture), désactivées par défaut
+        metrics_port = self._config.get('metrics_port')
+        metrics_file = self._config.get('metrics_file')
+        if (metrics_port or metrics_file) and not metrics.enabled:
+            metrics.enable(port=ORACLE_METRICS_PORT if metrics_port is True else metrics_port, path=metrics_file)
+
+
+    @property
+    def _client(self):
+        """Client OpenAI, créé au premier usage ou d'avance par warm_up()"""
+        if self._openai is None:
+            with self._openai_lock:
+                if self._openai is None:
+                    import httpx
+                    from openai import OpenAI, DefaultHttpxClient
+                    self._openai = OpenAI(
+                        api_key=self._config['openai_api_key'],
+                        http_client=DefaultHttpxClient(limits=httpx.Limits(
+                            max_connections=10, max_keepalive_connections=4, keepalive_expiry=OPENAI_KEEPALIVE))
+                    )
+        return self._openai
+
+    def warm_up(self):
+        """Prépare ce que le premier visiteur attendrait sinon : imports, connexions, modèle STT, sons
+
+        Les étapes sont indépendantes (un échec n'empêche pas les suivantes).
+        Renvoie la durée de chaque étape, en secondes.
+        """
+        steps = [
+            ("openai", lambda: self._client.models.retrieve(GPT_MODEL)),
+            ("tts", lambda: self.text_to_speech(FALLBACK_RESPONSE)),
+            ("portail", self.dispatcher.warm_up),
+            ("stt", self.stt_backend.warm_up),
+            ("sons", self._load_confirmation_sounds),
+        ]
+        timings = {}
+        for name, step in steps:
+            start = time.monotonic()
+            try:
+                step()
+            except Exception as e:
+                self.logger.warning(f"Préchauffage {name} impossible : {e}")
+            timings[name] = time.monotonic() - start
+            metrics.observe(f"warm_up_{name}", timings[name])
+        self.logger.info("Préchauffage terminé : " + ", ".join(
+            f"{name} {duration * 1000:.0f} ms" for name, duration in timings.items()))
+        return timings
+
+    def warm_connections(self, speculate=False, cancelled=None):
+        """Rouvre les connexions (portail, OpenAI) juste avant une conversation
+
+        Côté OpenAI, une simple lecture du modèle (non facturée) ouvre la
+        connexion TLS du pool, gardée OPENAI_KEEPALIVE secondes. Avec `speculate`,
+        la phrase d'engagement est générée à sa place (voir speculate_greeting) et
+        renvoyée. L'événement `cancelled` (départ du visiteur) interrompt la préparation.
+        """
+        with metrics.span("prewarm_portal"):
+            self.dispatcher.warm_up()
+        if cancelled is not None and cancelled.is_set():
+            return None
+        if speculate:
+            return self.speculate_greeting(cancelled)
         try:
-            timestamp = int(time.time())
-            public_id = f"oracle_response_{timestamp}"
-            
-            result = cloudinary.uploader.upload(
-                audio_file,
-                resource_type="auto",
-                public_id=public_id,
-                folder="oracle_sounds"
-            )
-            
-            self.logger.info(f"Audio uploadé vers Cloudinary: {result['secure_url']}")
-            return result['secure_url']
+            with metrics.span("prewarm_openai"):
+                self._client.models.retrieve(GPT_MODEL)
         except Exception as e:
-            self.logger.error(f"Erreur d'upload vers Cloudinary: {e}")
-            return None
+            self.logger.warning(f"Préchauffage OpenAI impossible : {e}")
+        return None
 
-    def send_to_server(self, message_type, content, audio_url=None):
-        """Envoie un message au serveur de visualisation"""
+    def speculate_greeting(self, cancelled=None):
+        """Génère d'avance la phrase d'engagement du visiteur ; renvoie (texte, fichier audio) ou None
+
+        Requête GPT facturée : la conversation joue cette phrase à la place d'une
+        phrase préenregistrée, et sa synthèse est déjà prête à son démarrage.
+        """
         try:
-            # URL de votre nouveau service Render
-            server_url = "https://oracle-live-portal.onrender.com/api/message"
-            
-            data = {
-                "type": message_type,  # "user" ou "system"
-                "content": content,
-                "audio_url": audio_url  # Nouvelle propriété pour l'URL audio
-            }
-            
-            response = requests.post(server_url, json=data)
-            if response.status_code == 200:
-                self.logger.info(f"Message envoyé au serveur avec succès")
-                return True
-            else:
-                self.logger.error(f"Erreur lors de l'envoi au serveur: {response.status_code}")
-                return False
+            with metrics.span("prewarm_llm"):
+                response = self._client.chat.completions.create(
+                    model=GPT_MODEL,
+                    temperature=0.9,
+                    max_tokens=60,
+                    messages=[
+                        {"role": "system", "content": self._system_prompt()},
+                        {"role": "system", "content": GREETING_PROMPT}
+                    ]
+                )
+            text = (response.choices[0].message.content or "").strip()
         except Exception as e:
-            self.logger.error(f"Erreur de connexion au serveur: {str(e)}")
-            return False
-
-    def play_random_confirmation_sound(self):
-        """Joue un son aléatoire depuis le dossier sounds de manière asynchrone"""
+            self.logger.warning(f"Phrase d'engagement anticipée impossible : {e}")
+            return None
+        if not text or (cancelled is not None and cancelled.is_set()):
+            return None
+        audio_path = self.text_to_speech(text)
+        if not audio_path:
+            return None
+        return text, audio_path
+
+    def _create_stt_backend(self, name):
+        """Instancie le backend de reconnaissance vocale, avec repli sur Google en cas d'échec"""
+        params = {}
+        if name == 'vosk':
+            params['model_path'] = self._config.get('vosk_model_path', VOSK_MODEL_PATH)
+            params['on_partial'] = lambda text: self.logger.debug(f"Reconnaissance partielle : {text}")
         try:
-            # Liste tous les fichiers du dossier sounds
-            sound_files = [f for f in os.listdir('sounds') if f.endswith(('.mp3', '.wav'))]
-            if sound_files:
-                # Choisit et charge un son au hasard
-                random_sound = random.choice(sound_files)
-                sound_path = os.path.join('sounds', random_sound)
-                sound = pygame.mixer.Sound(sound_path)
+            backend = make_backend(name, **params)
+            self.logger.info(f"Reconnaissance vocale : {backend.name}")
+            return backend
+        except Exception as e:
+            self.logger.warning(f"Backend de reconnaissance {name} indisponible ({e}), repli sur Google")
+            return GoogleBackend()
+
+    def _system_prompt(self):
+        system_prompt = SYSTEM_PROMPT
+        if self.punctuation_mode != 'llm':
+            system_prompt += TRANSCRIPTION_NOTE
+        return system_prompt
+
+    def reset_conversation(self):
+        """Réinitialise l'historique pour un nouveau visiteur (les ressources restent ouvertes)"""
+        self.memory.reset(self._system_prompt())
+
+    @property
+    def conversation_history(self):
+        """Messages envoyés à l'API (prompt système, résumé, derniers échanges)"""
+        return self.memory.messages()
+
+    def summarize_history(self, summary, messages):
+        """Condense les échanges retirés de l'historique dans le résumé courant"""
+        exchanges = "\n".join(
+            f"{'Visiteur' if message['role'] == 'user' else 'Oracle'} : {message['content']}"
+            for message in messages
+        )
+        response = self._client.chat.completions.create(
+            model=GPT_MODEL,
+            temperature=0.3,
+            max_tokens=self.summary_max_tokens,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Résumé actuel : {summary or '(aucun)'}\n\nNouveaux échanges :\n{exchanges}"}
+            ]
+        )
+        return response.choices[0].message.content
 
+    def send_to_server(self, message_type, content, audio_url=None):
+        """Envoie un message au serveur de visualisation (mis en file, sans attendre le réseau)"""
+        return self.dispatcher.send(message_type, content, audio_url)
+
+    def close(self):
+        """Termine les uploads et envoie les messages en attente avant l'arrêt"""
+        if self.uploads:
+            self.uploads.close()
+            stats = self.uploads.stats()
+            self.logger.info(f"Uploads : {stats['uploaded']} envoyés, {stats['deduplicated']} déjà connus, {stats['pending']} laissés dans le spool")
+        self.dispatcher.close()
+        stats = self.dispatcher.stats()
+        self.logger.info(f"Messages au serveur : {stats['sent']} envoyés, {stats['failed']} en échec, {stats['dropped']} écartés")
+        metrics.close()
+
+    def _load_confirmation_sounds(self):
+        """Décode une fois pour toutes les sons de confirmation du dossier sounds"""
+        sounds = []
+        for sound_file in sorted(os.listdir('sounds')):
+            if sound_file.endswith(('.mp3', '.wav')):
+                sound = pygame.mixer.Sound(os.path.join('sounds', sound_file))
                 # Ajuster le volume (0.0 à 1.0)
                 sound.set_volume(0.5)  # Règle le volume à 50%
-                
-                # Joue le son sans attendre
-                self.confirm_channel.play(sound)
+                sounds.append(sound)
+        self._confirmation_sounds = sounds
+        return sounds
+
+    def play_random_confirmation_sound(self):
+        """Joue un son aléatoire depuis le dossier sounds de manière asynchrone"""
+        try:
+            sounds = self._confirmation_sounds
+            if sounds is None:
+                sounds = self._load_confirmation_sounds()
+            if sounds:
+                # Joue un son au hasard sans attendre
+                self.confirm_channel.play(random.choice(sounds))
                 
         except Exception as e:
             self.logger.error(f"Erreur son de confirmation : {e}")
 
+    def punctuate(self, text):
+        """Ponctue une transcription selon punctuation_mode"""
+        if self.punctuation_mode == 'llm':
+            return self.add_punctuation(text)
+        if self.punctuation_mode == 'local':
+            return restore_punctuation(text)
+        return text
+
     def add_punctuation(self, text):
         """Ajoute de la ponctuation au texte transcrit"""
         try:
             response = self._client.chat.completions.create(
-                model="gpt-4-0125-preview",
+                model=GPT_MODEL,
                 messages=[
                     {
                         "role": "system", 
@@ -199,95 +415,325 @@ Retourne UNIQUEMENT le texte ponctué, aucune explication ni autre texte."""
     def get_oracle_response(self, text):
         """Obtient une réponse de l'Oracle des Dimensions"""
         # Ajouter le message de l'utilisateur à l'historique
-        self.conversation_history.append({
-            "role": "user", 
-            "content": text
-        })
+        self.memory.add("user", text)
+        self.logger.info(f"Taille du prompt : {self.memory.tokens()} tokens")
 
         try:
-            response = self._client.chat.completions.create(
-                model="gpt-4-0125-preview",
-                temperature=0.7,
-                max_tokens=150,
-                messages=self.conversation_history
-            )
+            with metrics.span("llm"):
+                response = self._client.chat.completions.create(
+                    model=GPT_MODEL,
+                    temperature=0.7,
+                    max_tokens=150,
+                    messages=self.conversation_history
+                )
             
             # Extraire la réponse
             oracle_response = response.choices[0].message.content
             
             # Ajouter la réponse à l'historique
-            self.conversation_history.append({
-                "role": "assistant", 
-                "content": oracle_response
-            })
-            
-            # Gérer la longueur de l'historique
-            if len(self.conversation_history) > self.MAX_HISTORY_LENGTH:
-                # Conserver le message système et supprimer les plus anciens messages
-                self.conversation_history = [self.conversation_history[0]] + self.conversation_history[-(self.MAX_HISTORY_LENGTH-1):]
+            self.memory.add("assistant", oracle_response)
             
             self.logger.info(f"Réponse de l'Oracle : {oracle_response}")
             return oracle_response
         
         except Exception as e:
             self.logger.error(f"Erreur Oracle : {e}")
-            return "Les échos des dimensions s'estompent."
+            return FALLBACK_RESPONSE
+
+    def stream_oracle_response(self, text, record=True):
+        """Obtient une réponse en streaming et produit chaque phrase dès qu'elle est complète
 
-    def text_to_speech(self, text):
-        """Convertit le texte en audio avec gTTS au lieu de Polly"""
+        Avec record=False, la réponse n'est pas ajoutée à l'historique : l'appelant
+        y enregistre lui-même ce que le visiteur a réellement entendu.
+        """
+        self.memory.add("user", text)
+        self.logger.info(f"Taille du prompt : {self.memory.tokens()} tokens")
+
+        sentences = []
+        stream = None
+        start = time.monotonic()
         try:
-            output_file = 'oracle_response.mp3'
+            stream = self._client.chat.completions.create(
+                model=GPT_MODEL,
+                temperature=0.7,
+                max_tokens=150,
+                messages=self.conversation_history,
+                stream=True
+            )
             
-            # Création de l'objet gTTS
-            tts = gTTS(text=text, lang='fr', slow=False)
+            buffer = ""
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                buffer += chunk.choices[0].delta.content or ""
+                complete, buffer = split_sentences(buffer)
+                for sentence in complete:
+                    if not sentences:
+                        metrics.observe("llm_first_sentence", time.monotonic() - start)
+                    sentences.append(sentence)
+                    yield sentence
             
-            # Sauvegarder le fichier audio
-            tts.save(output_file)
+            # Dernière phrase, éventuellement sans ponctuation finale
+            if buffer.strip():
+                if not sentences:
+                    metrics.observe("llm_first_sentence", time.monotonic() - start)
+                sentences.append(buffer.strip())
+                yield buffer.strip()
+            metrics.observe("llm", time.monotonic() - start)
+        
+        except GeneratorExit:
+            # Réponse interrompue : l'historique garde la partie déjà générée
+            if stream is not None:
+                stream.close()
+            if sentences and record:
+                self._record_response(sentences)
+            raise
+        
+        except Exception as e:
+            self.logger.error(f"Erreur Oracle : {e}")
+            if not sentences:
+                yield FALLBACK_RESPONSE
+                return
+
+        if record:
+            self._record_response(sentences)
+
+    def _record_response(self, sentences):
+        oracle_response = " ".join(sentences)
+        self.memory.add("assistant", oracle_response)
+        self.logger.info(f"Réponse de l'Oracle : {oracle_response}")
+
+    def respond_streaming(self, text):
+        """Répond en pipeline : génération, synthèse et lecture se chevauchent phrase par phrase
+
+        Un thread consomme le flux de l'API et synthétise chaque phrase pendant
+        que la précédente est lue. Le temps jusqu'au premier son est mesuré
+        dans `time_to_first_audio`. Si le visiteur interrompt l'Oracle, seules
+        les phrases dont la lecture a commencé entrent dans l'historique.
+        Renvoie le texte de la réponse (la partie entendue si elle a été interrompue).
+        """
+        start = time.monotonic()
+        audio_queue = queue.Queue()
+        sentences = []
+        self.player.begin_response()
+
+        def produce():
+            stream = self.stream_oracle_response(text, record=False)
+            try:
+                for sentence in stream:
+                    # Visiteur qui reprend la parole : inutile de générer la suite
+                    if self.player.interrupted.is_set():
+                        break
+                    sentences.append(sentence)
+                    audio_file = self.text_to_speech(sentence)
+                    if audio_file:
+                        audio_queue.put((sentence, audio_file))
+            finally:
+                stream.close()
+                audio_queue.put(None)
+
+        threading.Thread(target=produce, daemon=True).start()
+
+        played = []
+        heard = []
+        interrupted = False
+        try:
+            while True:
+                item = audio_queue.get()
+                if item is None:
+                    break
+                if self.player.interrupted.is_set():
+                    interrupted = True
+                    break
+                sentence, audio_file = item
+                if not played:
+                    self.time_to_first_audio = time.monotonic() - start
+                    self.logger.info(f"Temps jusqu'au premier son : {self.time_to_first_audio:.2f} s")
+                    metrics.observe("time_to_first_audio", self.time_to_first_audio)
+                heard.append(sentence)
+                completed = self.play_audio(audio_file)
+                played.append(audio_file)
+                if not completed:
+                    self.logger.info("Réponse interrompue par le visiteur")
+                    metrics.increment("barge_in")
+                    interrupted = True
+                    break
+            interrupted = interrupted or self.player.interrupted.is_set()
+        finally:
+            self.player.end_response()
+            metrics.observe("response", time.monotonic() - start)
+
+        # Historique : la réponse complète, ou seulement la partie entendue avant l'interruption
+        # (la réponse de repli, en cas d'erreur de l'API, n'y entre pas)
+        recorded = heard if interrupted else sentences
+        if recorded and recorded != [FALLBACK_RESPONSE]:
+            self._record_response(recorded)
+
+        oracle_response = " ".join(recorded)
+        if played:
+            # Les segments MP3 se concatènent tels quels en un seul fichier pour l'upload
+            def concatenate(output_file):
+                with open(output_file, 'wb') as out:
+                    for audio_file in played:
+                        with open(audio_file, 'rb') as part:
+                            out.write(part.read())
+            output_file = self.tts_cache.store(oracle_response, 'fr', 'gtts-segments', concatenate)
+            self.queue_upload(oracle_response, output_file)
+        else:
+            self.send_to_server("system", oracle_response)
+        return oracle_response
+
+    def text_to_speech(self, text, lang='fr'):
+        """Convertit le texte en audio avec gTTS, via le cache disque (un fichier par texte)"""
+        try:
+            cached = self.tts_cache.get(text, lang, 'gtts')
+            if cached:
+                metrics.increment("tts_cache_hit")
+                return cached
+            metrics.increment("tts_cache_miss")
             
-            return output_file
+            with metrics.span("tts"):
+                from gtts import gTTS
+                
+                # Création de l'objet gTTS
+                tts = gTTS(text=text, lang=lang, slow=False)
+                
+                # Sauvegarder le fichier audio dans le cache
+                return self.tts_cache.store(text, lang, 'gtts', tts.save)
         except Exception as e:
             self.logger.error(f"Erreur de synthèse vocale : {e}")
             return None
 
     def play_audio(self, audio_file):
-        """Joue le fichier audio de la réponse"""
+        """Joue le fichier audio de la réponse ; renvoie False si le visiteur l'a interrompue"""
         try:
-            pygame.mixer.music.load(audio_file)
-            pygame.mixer.music.play()
-            
-            while pygame.mixer.music.get_busy():
-                pygame.time.Clock().tick(10)
-            # Estomper le son de confirmation en 2 secondes
-            if self.confirm_channel.get_busy():
-                self.confirm_channel.fadeout(1200)  # 1200 millisecondes = 2 secondes
+            with metrics.span("playback"):
+                self.player.play_file(audio_file)
+                return self.player.wait()
         except Exception as e:
             self.logger.error(f"Erreur de lecture audio : {e}")
+            return True
 
-    def process_response_async(self, oracle_response, audio_response):
+    def play_sound(self, sound):
+        """Joue un son déjà décodé en mémoire (pygame.mixer.Sound) sur le canal principal"""
+        try:
+            with metrics.span("playback"):
+                self.player.play_sound(sound)
+                return self.player.wait()
+        except Exception as e:
+            self.logger.error(f"Erreur de lecture audio : {e}")
+            return True
+
+    def create_capture(self):
+        """Session de capture micro reliée au lecteur, pour interrompre l'Oracle quand le visiteur parle"""
+        return SpeechCapture(player=self.player, barge_in=self.barge_in, barge_in_ratio=self.barge_in_ratio,
+                             backend=self.stt_backend)
+
+    def process_response_async(self, oracle_response, audio_response, sound=None):
         """Traite la réponse de l'oracle de manière asynchrone pour ne pas bloquer la conversation"""
-        # Jouer l'audio localement immédiatement
-        self.play_audio(audio_response)
+        # Jouer l'audio localement immédiatement (depuis la mémoire si le son est préchargé)
+        if sound is not None:
+            self.play_sound(sound)
+        else:
+            self.play_audio(audio_response)
         
-        # Lancer l'upload et l'envoi au serveur dans un thread séparé
-        threading.Thread(
-            target=self._background_upload,
-            args=(oracle_response, audio_response),
-            daemon=True  # Pour que le thread se termine si le programme principal s'arrête
-        ).start()
-
-    def _background_upload(self, oracle_response, audio_file):
-        """Fonction exécutée en arrière-plan pour l'upload et l'envoi au serveur"""
+        # Upload et envoi au serveur en arrière-plan
+        self.queue_upload(oracle_response, audio_response)
+
+    def queue_upload(self, oracle_response, audio_file):
+        """Confie l'audio au spool d'upload ; la réponse part au serveur avec son URL une fois connue"""
+        if self.uploads is None:
+            self.send_to_server("system", oracle_response)
+            return
         try:
-            # Upload l'audio vers Cloudinary
-            audio_url = self.upload_audio_to_cloudinary(audio_file)
-            
-            # Envoyer la réponse avec l'URL audio au serveur
-            self.send_to_server("system", oracle_response, audio_url)
+            self.uploads.submit(audio_file, oracle_response)
         except Exception as e:
             self.logger.error(f"Erreur dans le traitement en arrière-plan : {e}")
+            self.send_to_server("system", oracle_response)
+
+# === Sortie d'erreur ===
+# PortAudio et ALSA écrivent leurs avertissements directement sur le descripteur 2
+_stderr_file = None
+_old_stderr = None
+
+def silence_stderr():
+    """Redirige la sortie d'erreur du processus vers un fichier temporaire
+
+    Renvoie un flux vers la sortie d'erreur d'origine, pour les journaux.
+    """
+    global _stderr_file, _old_stderr
+    if _old_stderr is None:
+        _stderr_file = tempfile.NamedTemporaryFile()
+        _old_stderr = os.dup(sys.stderr.fileno())
+        os.dup2(_stderr_file.fileno(), sys.stderr.fileno())
+    return os.fdopen(os.dup(_old_stderr), 'w', buffering=1)
+
+def restore_stderr():
+    global _stderr_file, _old_stderr
+    if _old_stderr is not None:
+        os.dup2(_old_stderr, sys.stderr.fileno())
+        os.close(_old_stderr)
+        _stderr_file.close()
+        _stderr_file = _old_stderr = None
+
+def recognize(oracle, audio, text=None):
+    """Transcrit une phrase captée et la ponctue (None si incompréhensible)
+
+    `text` est la transcription déjà décodée au fil de l'eau par le backend, le cas échéant.
+    """
+    try:
+        start = time.monotonic()
+        if text is None:
+            text = oracle.stt_backend.transcribe(audio)
+        elif not text:
+            raise sr.UnknownValueError()
+        elapsed = time.monotonic() - start
+        metrics.observe("stt", elapsed)
+        oracle.logger.info(f"Reconnaissance ({oracle.stt_backend.name}) : {elapsed * 1000:.0f} ms")
+        oracle.play_random_confirmation_sound()  # Joue un son de manière asynchrone
+        # Ajouter la ponctuation ici
+        print(f"📝 TexteEntendu : {text}")
+        start = time.monotonic()
+        punctuated_text = oracle.punctuate(text)
+        elapsed = time.monotonic() - start
+        metrics.observe("punctuation", elapsed)
+        oracle.logger.info(f"Ponctuation ({oracle.punctuation_mode}) : {elapsed * 1000:.0f} ms")
+        print(f"📝 Transcription : {punctuated_text}")
+        return punctuated_text
+
+    except sr.UnknownValueError:
+        print("❌ Impossible de comprendre l'audio")
+
+    except sr.RequestError as e:
+        print(f"❌ Erreur de service : {e}")
+
+    return None
+
+def speech_to_text(oracle, capture=None):
+    """Convertit la parole en texte
+
+    Avec une session de capture (SpeechCapture), le micro reste ouvert d'un tour
+    à l'autre : seules les phrases commencées après la fin de la dernière lecture
+    de l'Oracle (ou après l'appel) sont retenues.
+    """
+    if capture is not None:
+        since = time.monotonic()
+        player = capture.player
+        if player is not None and not player.busy and player.speech_ended_at is not None:
+            # Depuis la fin de la dernière lecture : une réponse immédiate du visiteur,
+            # commencée juste avant cet appel, est retenue
+            since = min(since, player.speech_ended_at)
+        print("🚀 Parlez maintenant !")
+        # timeout: le temps d'attente pour commencer à parler (+ durée maximale d'une phrase)
+        utterance = capture.get_utterance(timeout=10 + capture.phrase_time_limit, since=since)
+        if utterance is None:
+            print("⏰ Aucun son détecté. Temps d'attente dépassé.")
+            return None
+        text = recognize(oracle, utterance.audio, utterance.text)
+        # Fin de la phrase du visiteur → texte ponctué
+        metrics.observe("speech_end_to_text", time.monotonic() - utterance.end_time)
+        return text
 
-def speech_to_text(oracle):
-    """Convertit la parole en texte"""
     recognizer = sr.Recognizer()
 
     # Ajuster ce paramètre pour augmenter le temps de pause toléré entre les mots
@@ -304,21 +750,7 @@ def speech_to_text(oracle):
             # timeout: le temps d'attente pour commencer à parler
             # phrase_time_limit: durée maximale d'une phrase
             audio = recognizer.listen(source, timeout=10, phrase_time_limit=30)
-            
-            try:
-                text = recognizer.recognize_google(audio, language='fr-FR')
-                oracle.play_random_confirmation_sound()  # Joue un son de manière asynchrone
-                # Ajouter la ponctuation ici
-                print(f"📝 TexteEntendu : {text}")
-                punctuated_text = oracle.add_punctuation(text)
-                print(f"📝 Transcription : {punctuated_text}")
-                return punctuated_text
-            
-            except sr.UnknownValueError:
-                print("❌ Impossible de comprendre l'audio")
-            
-            except sr.RequestError as e:
-                print(f"❌ Erreur de service : {e}")
+            return recognize(oracle, audio)
         
         except sr.WaitTimeoutError:
             print("⏰ Aucun son détecté. Temps d'attente dépassé.")
@@ -329,16 +761,27 @@ def main():
 
     global should_stop
 
+    capture = None
+    oracle = None
+    silence_stderr()
     try:
         oracle = OracleAssistant()
+        capture = oracle.create_capture()
+        capture.start()
 
         while not should_stop:  # Vérifier la variable should_stop
-            text = speech_to_text(oracle)
+            text = speech_to_text(oracle, capture)
             
             if text:
                 # Envoyer le message utilisateur au serveur
                 oracle.send_to_server("user", text)
                 
+                if oracle.streaming:
+                    # Lecture phrase par phrase pendant la génération
+                    oracle_response = oracle.respond_streaming(text)
+                    print(f"🔮 Réponse de l'Oracle : {oracle_response}")
+                    continue
+                
                 oracle_response = oracle.get_oracle_response(text)
                 print(f"🔮 Réponse de l'Oracle : {oracle_response}")
                 
@@ -355,9 +798,12 @@ def main():
     except KeyboardInterrupt:
         print("\n👋 Assistant vocal arrêté.")
     finally:
+        if capture:
+            capture.stop()
+        if oracle:
+            oracle.close()
         # Restaurer stderr
-        os.dup2(old_stderr, sys.stderr.fileno())
-        stderr.close()
+        restore_stderr()
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,73 @@
 import binascii
 import math
 
+import numpy as np
+
+# === Format d'un paquet LD06/LD19 (47 octets, little-endian) ===
+PACKET_HEADER = 0x54
+PACKET_VER_LEN = 0x2C
+PACKET_LENGTH = 47
+POINTS_PER_PACKET = 12
+
+POINT_DTYPE = np.dtype([
+    ('distance', '<u2'),
+    ('confidence', 'u1'),
+])
+
+PACKET_DTYPE = np.dtype([
+    ('header', 'u1'),
+    ('ver_len', 'u1'),
+    ('speed', '<u2'),
+    ('start_angle', '<u2'),
+    ('points', POINT_DTYPE, (POINTS_PER_PACKET,)),
+    ('end_angle', '<u2'),
+    ('timestamp', '<u2'),
+    ('crc', 'u1'),
+])
+
+# === Table CRC8 du protocole LD06/LD19 (polynôme 0x4D) ===
+def _build_crc_table(poly=0x4D):
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return bytes(table)
+
+CRC_TABLE = _build_crc_table()
+_CRC_TABLE_NP = np.frombuffer(CRC_TABLE, dtype=np.uint8)
+
+
+def crc8(data):
+    """Calcule le CRC8 d'une séquence d'octets"""
+    crc = 0
+    for b in data:
+        crc = CRC_TABLE[crc ^ b]
+    return crc
+
+
+def check_packet(packet):
+    """Vérifie l'octet CS d'un paquet complet de 47 octets"""
+    return crc8(packet[:PACKET_LENGTH - 1]) == packet[PACKET_LENGTH - 1]
+
+
+def check_packets(buffer):
+    """Vérifie le CRC de N paquets à la fois, renvoie un masque booléen"""
+    raw = np.frombuffer(buffer, dtype=np.uint8, count=(len(buffer) // PACKET_LENGTH) * PACKET_LENGTH)
+    raw = raw.reshape(-1, PACKET_LENGTH)
+    crc = np.zeros(len(raw), dtype=np.uint8)
+    for column in range(PACKET_LENGTH - 1):
+        crc = _CRC_TABLE_NP[crc ^ raw[:, column]]
+    return crc == raw[:, PACKET_LENGTH - 1]
+
+
+# Indices des points dans un paquet, réutilisés pour chaque décodage
+_POINT_INDEX = np.arange(POINTS_PER_PACKET, dtype=np.float64)
+
+
 class LidarData:
+    """Vue légère sur un paquet d'un lot décodé (les tableaux ne sont pas copiés)"""
     def __init__(self,FSA,LSA,CS,Speed,TimeStamp,Confidence_i,Angle_i,Distance_i):
         self.FSA = FSA
         self.LSA = LSA
@@ -14,34 +80,80 @@ class LidarData:
         self.Distance_i = Distance_i
 
 
+class LidarBatch:
+    """Lot de N paquets décodés, stocké sous forme de tableaux NumPy contigus"""
+    def __init__(self, FSA, LSA, CS, Speed, TimeStamp, Confidence, Angle, Distance):
+        # Métadonnées par paquet (taille N)
+        self.FSA = FSA
+        self.LSA = LSA
+        self.CS = CS
+        self.Speed = Speed
+        self.TimeStamp = TimeStamp
+
+        # Points à plat (taille N * 12)
+        self.Confidence = Confidence
+        self.Angle = Angle
+        self.Distance = Distance
+
+    def __len__(self):
+        return len(self.FSA)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("index de paquet hors limites")
+        start = index * POINTS_PER_PACKET
+        end = start + POINTS_PER_PACKET
+        return LidarData(
+            float(self.FSA[index]),
+            float(self.LSA[index]),
+            int(self.CS[index]),
+            float(self.Speed[index]),
+            int(self.TimeStamp[index]),
+            self.Confidence[start:end],
+            self.Angle[start:end],
+            self.Distance[start:end],
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+def parse_packets(buffer):
+    """Interprète un buffer de N paquets bruts comme un tableau structuré (sans copie)"""
+    count = len(buffer) // PACKET_LENGTH
+    return np.frombuffer(buffer, dtype=PACKET_DTYPE, count=count)
+
+
+def decode_packets(buffer):
+    """Décode un bytes/memoryview contenant N paquets de 47 octets en un LidarBatch"""
+    packets = parse_packets(buffer)
+
+    Speed = packets['speed'] / 100
+    FSA = packets['start_angle'] / 100
+    LSA = packets['end_angle'] / 100
+
+    # Pas angulaire entre deux points, en tenant compte du passage par 360°
+    span = LSA - FSA
+    span = np.where(span > 0, span, span + 360)
+    angleStep = span / POINTS_PER_PACKET
+
+    degrees = FSA[:, None] + angleStep[:, None] * _POINT_INDEX
+    degrees = np.where(degrees >= 360, degrees - 360, degrees)
+    Angle = (degrees * math.pi / 180.0).ravel()
+
+    points = packets['points']
+    Distance = (points['distance'] / 100).ravel()
+    Confidence = np.ascontiguousarray(points['confidence']).ravel()
+
+    return LidarBatch(FSA, LSA, packets['crc'].copy(), Speed, packets['timestamp'].copy(),
+                      Confidence, Angle, Distance)
+
 
 def CalcLidarData(str):
+    """Décode un paquet sous forme de chaîne hexadécimale (sans l'en-tête 54 2C)"""
     str = str.replace(' ','')
-
-    Speed = int(str[2:4]+str[0:2],16)/100
-    FSA = float(int(str[6:8]+str[4:6],16))/100
-    LSA = float(int(str[-8:-6]+str[-10:-8],16))/100
-    TimeStamp = int(str[-4:-2]+str[-6:-4],16)
-    CS = int(str[-2:],16)
-
-    Confidence_i = list()
-    Angle_i = list()
-    Distance_i = list()
-    count = 0
-    if(LSA-FSA > 0):
-        angleStep = float(LSA-FSA)/(12)
-    else:
-        angleStep = float((LSA+360)-FSA)/(12)
-    
-    counter = 0
-    circle = lambda deg : deg - 360 if deg >= 360 else deg
-    for i in range(0,6*12,6): 
-        Distance_i.append(int(str[8+i+2:8+i+4] + str[8+i:8+i+2],16)/100)
-        Confidence_i.append(int(str[8+i+4:8+i+6],16))
-        Angle_i.append(circle(angleStep*counter+FSA)*math.pi/180.0)
-        counter += 1
-    
-
-    lidarData = LidarData(FSA,LSA,CS,Speed,TimeStamp,Confidence_i,Angle_i,Distance_i)
-    return lidarData
-    
+    raw = bytes((PACKET_HEADER, PACKET_VER_LEN)) + binascii.unhexlify(str)
+    return decode_packets(raw)[0]
@@ -4,11 +4,14 @@ import json
 import sys
 import threading
 import signal
-import random
 import logging
 
+from OracleIPC import CommandReceiver, COMMANDS_DIR
+from PhraseBank import PhraseBank
+from Metrics import metrics
+from ConversationPrewarm import ConversationPrewarm
+
 # === CONFIGURATION ===
-COMMANDS_DIR = "/tmp/oracle_commands"
 STATUS_DIR = "/tmp/oracle_status"
 ENGAGEMENT_DIR = "/home/pi5/THE_ORACLE_REUNIFIED/phrases_engagement"
 WELCOME_DIR = "/home/pi5/THE_ORACLE_REUNIFIED/phrases_bienvenue"
@@ -18,48 +21,60 @@ ORACLE_MODULE_PATH = "/home/pi5/THE_ORACLE_UNIFIED"
 # === LOGGING SETUP ===
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# === UTILITIES ===
-def decode_filename(filename):
-    if filename.endswith('.mp3'):
-        filename = filename[:-4]
-    if '_' in filename and filename.split('_')[0].isdigit():
-        filename = filename[filename.index('_')+1:]
-
-    special_codes = {
-        "_DOT_": ".", "_COMMA_": ",", "_SEMICOLON_": ";", "_COLON_": ":",
-        "_QUESTION_": "?", "_EXCLAMATION_": "!", "_APOSTROPHE_": "'", "_QUOTE_": '"',
-        "_DASH_": "-", "_AT_": "@", "_AND_": "&", "_OPENPAR_": "(", "_CLOSEPAR_": ")",
-        "_PERCENT_": "%", "_PLUS_": "+", "_EQUAL_": "=", "_SLASH_": "/",
-        "_BACKSLASH_": "\\", "_STAR_": "*", "_TILDE_": "~", "_LESS_": "<",
-        "_GREATER_": ">", "_OPENSQ_": "[", "_CLOSESQ_": "]", "_OPENCURL_": "{",
-        "_CLOSECURL_": "}", "_PIPE_": "|", "_CARET_": "^", "_DOLLAR_": "$",
-        "_HASH_": "#", "_BACKTICK_": "`"
-    }
-
-    for code, char in special_codes.items():
-        filename = filename.replace(code, char)
-    filename = filename.replace("_", " ")
-    for p in ['.', ',', ';', ':', '!', '?']:
-        filename = filename.replace(f" {p}", p)
-    filename = filename.replace(" ' ", "'")
-    return filename
-
-def play_random_phrase(oracle, directory, tag="assistant"):
-    files = [f for f in os.listdir(directory) if f.endswith(".mp3")]
-    if not files:
-        logging.warning(f"Aucun fichier trouvé dans {directory}")
-        return
-    random_file = random.choice(files)
-    file_path = os.path.join(directory, random_file)
-    decoded_text = decode_filename(random_file)
-    oracle.process_response_async(decoded_text, file_path)
-    oracle.conversation_history.append({"role": tag, "content": decoded_text})
-
 # === ORACLE SERVER CLASS ===
 class OracleServer:
     def __init__(self):
         self.conversation_thread = None
         self.should_stop = False
+        self.convers = None
+        self.oracle = None
+        self.phrases = None
+        self.capture = None
+        self.warm_up_thread = None
+        self.prewarm = None
+        self.fresh_history = False  # Historique réinitialisé et pas encore repris par une conversation
+
+    def init_assistant(self):
+        """Crée l'assistant une seule fois au démarrage (config, client OpenAI, Cloudinary, mixer audio)"""
+        sys.path.append(ORACLE_MODULE_PATH)
+        import CONVERS
+        self.convers = CONVERS
+
+        # Avertissements ALSA/PortAudio écartés ; les journaux restent sur la sortie d'erreur d'origine
+        log_stream = CONVERS.silence_stderr()
+        for handler in logging.getLogger().handlers:
+            if isinstance(handler, logging.StreamHandler):
+                handler.setStream(log_stream)
+
+        self.oracle = CONVERS.OracleAssistant()
+        logging.info("Assistant Oracle initialisé")
+
+        # Micro et connexions préparés dès l'approche du visiteur, repris par la conversation
+        self.prewarm = ConversationPrewarm(self.oracle, timeout=self.oracle.prewarm_timeout,
+                                           speculate=self.oracle.prewarm_llm)
+
+        # Phrases préenregistrées décodées une fois en mémoire (le mixer doit être initialisé)
+        self.phrases = PhraseBank([WELCOME_DIR, ENGAGEMENT_DIR, FAREWELL_DIR])
+        self.phrases.load()
+        self.phrases.start_watching()
+
+    def start_warm_up(self):
+        """Préchauffe l'assistant en arrière-plan (connexions, modèle STT, sons) : les commandes sont servies sans attendre"""
+        self.warm_up_thread = threading.Thread(target=self.oracle.warm_up, name="OracleWarmUp", daemon=True)
+        self.warm_up_thread.start()
+
+    def play_random_phrase(self, directory, tag="assistant"):
+        phrase = self.phrases.next(directory)
+        if phrase is None:
+            logging.warning(f"Aucun fichier trouvé dans {directory}")
+            return
+        self.oracle.process_response_async(phrase.text, phrase.path, sound=phrase.sound)
+        self.oracle.memory.add(tag, phrase.text)
+
+    def new_visitor(self):
+        """Repart d'un historique vierge pour le visiteur suivant"""
+        self.oracle.reset_conversation()
+        self.fresh_history = True
 
     def write_status(self, status):
         with open(os.path.join(STATUS_DIR, "status.json"), 'w') as f:
@@ -76,27 +91,56 @@ class OracleServer:
 
     def run_conversation(self):
         self.should_stop = False
-        sys.path.append(ORACLE_MODULE_PATH)
-        import CONVERS
+        oracle = self.oracle
+
+        # Historique vierge à chaque conversation, sauf s'il vient d'être préparé
+        # pour ce visiteur (engage) : un "start" sans engage ne reprend pas le précédent
+        if not self.fresh_history:
+            self.new_visitor()
+        self.fresh_history = False
 
         try:
-            oracle = CONVERS.OracleAssistant()
+            # Micro ouvert et calibré une seule fois pour toute la conversation (dès
+            # l'approche si elle a été préparée), qui reste à l'écoute pendant que
+            # l'Oracle parle (barge-in)
+            greeting = self.prewarm.take_greeting()
+            capture = self.prewarm.take_capture() or oracle.create_capture()
+            capture.barge_in = oracle.barge_in
+            self.capture = capture
+            self.capture.start()
+
             oracle.send_to_server("info", "Un visiteur est entré en contact")
-            play_random_phrase(oracle, ENGAGEMENT_DIR)
+            if greeting:
+                # Phrase d'engagement générée et synthétisée pendant l'approche (prewarm_llm)
+                text, audio_path = greeting
+                oracle.process_response_async(text, audio_path)
+                oracle.memory.add("assistant", text)
+            else:
+                self.play_random_phrase(ENGAGEMENT_DIR)
 
             while not self.should_stop:
-                text = CONVERS.speech_to_text(oracle)
+                text = self.convers.speech_to_text(oracle, self.capture)
                 if text:
                     oracle.send_to_server("user", text)
-                    response = oracle.get_oracle_response(text)
-                    logging.info(f"🔮 Réponse de l'Oracle : {response}")
-                    audio_path = oracle.text_to_speech(response)
-                    if audio_path:
-                        oracle.process_response_async(response, audio_path)
-                    else:
-                        oracle.send_to_server("system", response)
+                    with metrics.span("turn"):
+                        if oracle.streaming:
+                            # Lecture phrase par phrase pendant la génération
+                            response = oracle.respond_streaming(text)
+                            logging.info(f"🔮 Réponse de l'Oracle : {response}")
+                            continue
+                        response = oracle.get_oracle_response(text)
+                        logging.info(f"🔮 Réponse de l'Oracle : {response}")
+                        audio_path = oracle.text_to_speech(response)
+                        if audio_path:
+                            oracle.process_response_async(response, audio_path)
+                        else:
+                            oracle.send_to_server("system", response)
         except Exception as e:
             logging.error(f"Erreur dans la conversation : {e}")
+        finally:
+            if self.capture:
+                self.capture.stop()
+                self.capture = None
 
         self.write_status("idle")
         logging.info("Conversation terminée")
@@ -110,20 +154,36 @@ class OracleServer:
 
     def stop_conversation(self):
         self.should_stop = True
+        capture = self.capture
+        if capture:
+            capture.stop()  # Débloque l'attente d'une phrase
         if self.conversation_thread and self.conversation_thread.is_alive():
             self.conversation_thread.join(timeout=5)
             if self.conversation_thread.is_alive():
                 logging.warning("Le thread de conversation ne répond pas.")
 
 # === MAIN SERVER LOOP ===
+boot_start = time.monotonic()
 server = OracleServer()
 server.cleanup_on_startup()
-logging.info("Serveur Oracle démarré. En attente de commandes...")
+# Socket ouvert avant l'initialisation : les commandes reçues entre-temps attendent dans sa file
+receiver = CommandReceiver()
+server.init_assistant()
+server.start_warm_up()
+boot_time = time.monotonic() - boot_start
+metrics.observe("boot", boot_time)
+logging.info(f"Serveur Oracle démarré en {boot_time:.2f} s. En attente de commandes...")
 
 
 def signal_handler(sig, frame):
     logging.info("Signal reçu. Fermeture...")
     server.stop_conversation()
+    server.prewarm.cancel("arrêt")
+    server.phrases.stop()
+    server.oracle.close()
+    stats = receiver.latency_stats()
+    logging.info(f"Latence des commandes: {stats['count']} reçues, moyenne {stats['mean'] * 1000:.1f} ms, max {stats['max'] * 1000:.1f} ms")
+    receiver.close()
     sys.exit(0)
 
 signal.signal(signal.SIGINT, signal_handler)
@@ -131,37 +191,39 @@ signal.signal(signal.SIGTERM, signal_handler)
 
 while True:
     try:
-        commands = [f for f in os.listdir(COMMANDS_DIR) if f.endswith(".cmd")]
-        for cmd_file in commands:
-            cmd_path = os.path.join(COMMANDS_DIR, cmd_file)
-            with open(cmd_path, 'r') as f:
-                cmd_data = json.load(f)
+        # Attente événementielle sur le socket (les fichiers .cmd restent acceptés en repli)
+        for cmd_data in receiver.receive(timeout=0.2):
             command = cmd_data.get("command", "")
-
-            import CONVERS
-            oracle = CONVERS.OracleAssistant()
-
-            if command == "start" and (not server.conversation_thread or not server.conversation_thread.is_alive()):
-                server.write_status("starting")
-                server.start_conversation()
-                server.write_status("running")
-            elif command == "stop" and server.conversation_thread and server.conversation_thread.is_alive():
-                server.write_status("stopping")
-                server.stop_conversation()
-                server.write_status("idle")
-            elif command == "engage":
-                oracle.send_to_server("info", "Un visiteur approche")
-                play_random_phrase(oracle, WELCOME_DIR)
-            elif command == "departure":
-                play_random_phrase(oracle, FAREWELL_DIR)
-                oracle.send_to_server("info", "Le visiteur est parti")
-
-            try:
-                os.remove(cmd_path)
-            except FileNotFoundError:
-                pass
-
-        time.sleep(0.2)
+            oracle = server.oracle
+            # Latence Lidar → serveur (horodatage de l'envoi), puis traitement de la commande
+            metrics.observe("command_latency", cmd_data.get("latency", 0.0))
+            metrics.increment(f"command_{command}")
+
+            with metrics.span("command"):
+                if command == "start" and (not server.conversation_thread or not server.conversation_thread.is_alive()):
+                    server.write_status("starting")
+                    server.start_conversation()
+                    server.write_status("running")
+                elif command == "stop" and server.conversation_thread and server.conversation_thread.is_alive():
+                    server.write_status("stopping")
+                    server.stop_conversation()
+                    server.write_status("idle")
+                elif command == "engage":
+                    if not server.conversation_thread or not server.conversation_thread.is_alive():
+                        server.new_visitor()
+                        # Micro et connexions se préparent pendant la phrase d'accueil
+                        server.prewarm.start("engage")
+                    oracle.send_to_server("info", "Un visiteur approche")
+                    server.play_random_phrase(WELCOME_DIR)
+                elif command == "prewarm":
+                    # Visiteur en approche rapide, avant même la zone d'approche
+                    if not server.conversation_thread or not server.conversation_thread.is_alive():
+                        server.prewarm.start("approach")
+                elif command == "departure":
+                    server.prewarm.cancel()
+                    server.play_random_phrase(FAREWELL_DIR)
+                    oracle.send_to_server("info", "Le visiteur est parti")
+                    server.new_visitor()
 
     except Exception as e:
         logging.error(f"Erreur dans la boucle principale: {e}")
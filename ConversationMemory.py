@@ -0,0 +1,135 @@
+import logging
+import threading
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Budget de l'historique envoyé à chaque tour (résumé + derniers échanges), hors prompt système
+HISTORY_TOKEN_BUDGET = 600
+
+# Une fois le budget dépassé, l'historique est ramené à cette fraction du budget :
+# les messages sont résumés par lots plutôt qu'un appel par message
+COMPACT_RATIO = 0.6
+
+# Tokens ajoutés par l'API pour chaque message (rôle, séparateurs)
+MESSAGE_OVERHEAD = 4
+
+# Derniers messages toujours conservés tels quels (la question en cours et la réponse précédente)
+MIN_RECENT_MESSAGES = 2
+
+SUMMARY_INTRO = "Résumé des échanges précédents avec ce visiteur : "
+
+
+class TokenCounter:
+    """Compte les tokens avec tiktoken s'il est installé, sinon par estimation (≈ 3,5 caractères par token en français)"""
+    def __init__(self, encoding="cl100k_base"):
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.get_encoding(encoding)
+            except Exception as e:
+                logging.getLogger('ConversationMemory').warning(f"Encodage tiktoken indisponible ({e}), estimation utilisée")
+
+    def __call__(self, text):
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return int(len(text) / 3.5) + 1
+
+    def message(self, message):
+        return self(message["content"]) + MESSAGE_OVERHEAD
+
+
+class ConversationMemory:
+    """Historique de conversation borné en tokens, avec résumé glissant des échanges les plus anciens
+
+    Quand les derniers échanges dépassent le budget, les plus anciens sont
+    retirés de l'historique et condensés dans un résumé par summarizer(résumé,
+    messages) dans un thread, hors du chemin de la réponse : le tour suivant
+    envoie le résumé à la place des messages retirés. Sans summarizer, les
+    messages les plus anciens sont simplement oubliés.
+    """
+    def __init__(self, system_prompt, token_budget=HISTORY_TOKEN_BUDGET, summarizer=None, counter=None):
+        self.system_prompt = system_prompt
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.count = counter or TokenCounter()
+        self.logger = logging.getLogger('ConversationMemory')
+
+        self._lock = threading.Lock()
+        self._turns = []
+        self._summary = ""
+        self._generation = 0  # Incrémenté à chaque visiteur : un résumé en retard est ignoré
+        self._summarizing = None
+
+    def reset(self, system_prompt=None):
+        """Oublie le visiteur précédent (historique et résumé)"""
+        with self._lock:
+            if system_prompt is not None:
+                self.system_prompt = system_prompt
+            self._turns = []
+            self._summary = ""
+            self._generation += 1
+
+    def add(self, role, content):
+        """Ajoute un message et ramène l'historique dans le budget"""
+        with self._lock:
+            self._turns.append({"role": role, "content": content})
+            evicted = self._compact()
+            if evicted:
+                self._summarize(evicted, self._generation)
+
+    def _compact(self):
+        """Retire les messages les plus anciens au-delà du budget ; renvoie les messages retirés"""
+        tokens = self.count(self._summary) + sum(self.count.message(turn) for turn in self._turns)
+        evicted = []
+        if tokens <= self.token_budget:
+            return evicted
+        while tokens > self.token_budget * COMPACT_RATIO and len(self._turns) > MIN_RECENT_MESSAGES:
+            turn = self._turns.pop(0)
+            tokens -= self.count.message(turn)
+            evicted.append(turn)
+        return evicted
+
+    def _summarize(self, evicted, generation):
+        """Lance la mise à jour du résumé (appelé sous le verrou)"""
+        if self.summarizer is None:
+            return
+        previous = self._summarizing
+
+        def run():
+            # Les résumés sont produits dans l'ordre des évictions
+            if previous is not None:
+                previous.join()
+            with self._lock:
+                current = self._summary if generation == self._generation else None
+            if current is None:
+                return
+            try:
+                new_summary = self.summarizer(current, evicted)
+            except Exception as e:
+                self.logger.error(f"Erreur de résumé de l'historique : {e}")
+                return
+            with self._lock:
+                if generation == self._generation and new_summary:
+                    self._summary = new_summary.strip()
+
+        self._summarizing = threading.Thread(target=run, name="ConversationSummary", daemon=True)
+        self._summarizing.start()
+
+    def messages(self):
+        """Messages à envoyer à l'API : prompt système, résumé éventuel, derniers échanges"""
+        with self._lock:
+            messages = [{"role": "system", "content": self.system_prompt}]
+            if self._summary:
+                messages.append({"role": "system", "content": SUMMARY_INTRO + self._summary})
+            return messages + list(self._turns)
+
+    @property
+    def summary(self):
+        return self._summary
+
+    def tokens(self):
+        """Taille du prompt complet, en tokens"""
+        return sum(self.count.message(message) for message in self.messages())
@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+
+from Metrics import metrics
+
+PREWARM_TIMEOUT = 60.0  # s sans "start" avant de relâcher le micro
+HANDOFF_TIMEOUT = 2.0   # s d'attente de la session en cours de création lors de la reprise
+
+
+class ConversationPrewarm:
+    """Préparation d'une conversation dès qu'un visiteur approche ("engage" ou "prewarm")
+
+    start() ouvre et calibre le micro (session SpeechCapture, sans barge-in tant
+    que la conversation n'a pas commencé, pour ne pas couper la phrase d'accueil)
+    puis rouvre les connexions de l'assistant, dans un thread. Avec `speculate`,
+    la phrase d'engagement est générée pendant l'approche. take_greeting() et
+    take_capture() remettent la phrase et la session à la conversation ;
+    cancel() (départ du visiteur ou délai dépassé) referme tout.
+    """
+    def __init__(self, oracle, timeout=PREWARM_TIMEOUT, speculate=False):
+        self.oracle = oracle
+        self.timeout = timeout
+        self.speculate = speculate
+        self.logger = logging.getLogger('ConversationPrewarm')
+
+        self._lock = threading.Lock()
+        self._cancelled = None  # Événement de la préparation en cours (None : aucune)
+        self._registered = None  # Levé quand la préparation a créé (ou renoncé à créer) sa session
+        self._capture = None
+        self._greeting = None  # (texte, fichier audio) de la phrase d'engagement anticipée
+        self._timer = None
+
+        # Compteurs de diagnostic
+        self.started = 0
+        self.used = 0
+        self.cancelled = 0
+
+    @property
+    def active(self):
+        return self._cancelled is not None
+
+    def start(self, reason="engage"):
+        """Lance la préparation ; renvoie False si elle est déjà en cours (son délai est alors prolongé)"""
+        with self._lock:
+            self._restart_timer()
+            if self._cancelled is not None:
+                return False
+            cancelled = self._cancelled = threading.Event()
+            registered = self._registered = threading.Event()
+            self.started += 1
+        metrics.increment(f"prewarm_{reason}")
+        threading.Thread(target=self._run, args=(cancelled, registered, reason),
+                         name="ConversationPrewarm", daemon=True).start()
+        return True
+
+    def _restart_timer(self):
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.timeout, self.cancel, args=("délai dépassé",))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _run(self, cancelled, registered, reason):
+        start = time.monotonic()
+        capture = None
+        try:
+            capture = self.oracle.create_capture()
+            capture.barge_in = False
+        except Exception as e:
+            self.logger.error(f"Session micro anticipée impossible : {e}")
+        with self._lock:
+            if cancelled.is_set():
+                capture = None
+            elif capture is not None:
+                # Visible de take_capture() avant même la fin de la calibration
+                self._capture = capture
+            registered.set()
+
+        if capture is not None:
+            try:
+                with metrics.span("prewarm_audio"):
+                    capture.start()
+            except Exception as e:
+                self.logger.error(f"Ouverture anticipée du micro impossible : {e}")
+            if cancelled.is_set():
+                # Annulée pendant l'ouverture : cancel() a pu arrêter la session avant son démarrage
+                capture.stop()
+                return
+
+        if not cancelled.is_set():
+            greeting = self.oracle.warm_connections(speculate=self.speculate, cancelled=cancelled)
+            with self._lock:
+                # Écartée si la conversation a déjà démarré sans elle ou si la préparation est annulée
+                if greeting and self._cancelled is cancelled:
+                    self._greeting = greeting
+        if not cancelled.is_set():
+            self.logger.info(f"Conversation préparée ({reason}) en {time.monotonic() - start:.2f} s")
+
+    def take_greeting(self):
+        """Phrase d'engagement générée pendant l'approche, (texte, fichier audio), ou None si pas encore prête
+
+        À appeler avant take_capture(), qui termine la préparation.
+        """
+        with self._lock:
+            greeting = self._greeting
+            self._greeting = None
+        if greeting is not None:
+            metrics.increment("prewarm_greeting_used")
+        return greeting
+
+    def take_capture(self):
+        """Remet la session micro préparée à la conversation (None si aucune), et termine la préparation
+
+        Si la préparation est encore en train de créer sa session, attend qu'elle
+        l'ait enregistrée : aucune session ne reste ouverte sans propriétaire.
+        """
+        with self._lock:
+            cancelled = self._cancelled
+            registered = self._registered
+        if registered is not None and not registered.wait(HANDOFF_TIMEOUT):
+            with self._lock:
+                if not registered.is_set():
+                    # Préparation bloquée : elle renoncera à sa session
+                    cancelled.set()
+        with self._lock:
+            capture = self._capture
+            self._capture = None
+            self._greeting = None
+            if self._cancelled is cancelled:
+                self._cancelled = None
+                self._registered = None
+                if self._timer:
+                    self._timer.cancel()
+                    self._timer = None
+        if capture is not None:
+            self.used += 1
+            metrics.increment("prewarm_used")
+        return capture
+
+    def cancel(self, reason="départ"):
+        """Abandonne la préparation en cours et referme le micro"""
+        with self._lock:
+            cancelled = self._cancelled
+            capture = self._capture
+            self._cancelled = None
+            self._registered = None
+            self._capture = None
+            self._greeting = None
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+        if cancelled is None:
+            return False
+        cancelled.set()
+        if capture is not None:
+            capture.stop()
+        self.cancelled += 1
+        metrics.increment("prewarm_cancelled")
+        self.logger.info(f"Préparation de la conversation annulée ({reason})")
+        return True
@@ -0,0 +1,47 @@
+import numpy as np
+
+
+class CorridorPoints:
+    """Résultat du filtrage : masque sur la révolution et points retenus (coordonnées polaires et cartésiennes)"""
+    def __init__(self, mask, angles, distances, confidences, x, y):
+        self.mask = mask
+        self.angles = angles
+        self.distances = distances
+        self.confidences = confidences
+        self.x = x
+        self.y = y
+
+    def __len__(self):
+        return len(self.distances)
+
+
+class CorridorFilter:
+    """Filtre vectorisé du corridor de détection et conversion polaire → cartésien
+
+    Ne conserve que les points du demi-plan avant (0° à 180°), à moins de
+    `corridor_width` de l'axe, dans [min_distance, max_distance] et avec une
+    confiance suffisante. Les coordonnées x/y sont calculées une seule fois
+    et réutilisées par le clustering.
+    """
+    def __init__(self, corridor_width, min_distance, max_distance, min_confidence):
+        self.corridor_width = corridor_width
+        self.min_distance = min_distance
+        self.max_distance = max_distance
+        self.min_confidence = min_confidence
+
+    def masks(self, angles, distances, confidences):
+        """Renvoie le masque des points retenus et les coordonnées x/y de toute la révolution"""
+        x = distances * np.cos(angles)
+        y = distances * np.sin(angles)
+
+        angle_deg = np.degrees(angles) % 360
+        mask = (angle_deg <= 180)
+        mask &= np.abs(x) <= self.corridor_width
+        mask &= (distances >= self.min_distance) & (distances <= self.max_distance)
+        mask &= confidences >= self.min_confidence
+        return mask, x, y
+
+    def __call__(self, angles, distances, confidences):
+        mask, x, y = self.masks(angles, distances, confidences)
+        return CorridorPoints(mask, angles[mask], distances[mask], confidences[mask], x[mask], y[mask])
+
@@ -0,0 +1,114 @@
+import array
+import logging
+import threading
+import time
+
+from ola.ClientWrapper import ClientWrapper
+
+DMX_UNIVERSE = 1
+DMX_REFRESH_RATE = 44  # Hz, fréquence de rafraîchissement maximale d'un univers DMX512
+DMX_KEEPALIVE = 1.0    # s, renvoi de l'univers inchangé (reprise après un redémarrage d'olad)
+
+
+class DmxOutput:
+    """Sortie DMX dans un thread dédié qui fait tourner la boucle OLA à fréquence fixe
+
+    La détection ne fait que fixer des cibles (set()) ; à chaque tick, le thread
+    calcule les valeurs du fondu en cours dans le tampon arrière, et ne l'envoie
+    (puis échange les tampons) que s'il diffère de l'univers déjà envoyé. Les
+    callbacks de SendDmx sont servis par la boucle OLA.
+    """
+    def __init__(self, universe=DMX_UNIVERSE, channels=16, refresh_rate=DMX_REFRESH_RATE, keepalive=DMX_KEEPALIVE):
+        self.universe = universe
+        self.interval = 1.0 / refresh_rate
+        self.keepalive = keepalive
+        self.logger = logging.getLogger('DmxOutput')
+
+        self.wrapper = ClientWrapper()
+        self.client = self.wrapper.Client()
+
+        # Tampons d'univers : avant (dernier envoyé) et arrière (en préparation)
+        self._front = array.array('B', [0] * channels)
+        self._back = array.array('B', [0] * channels)
+
+        # Fondu en cours : valeurs de départ et d'arrivée, instant de départ, durée
+        self._lock = threading.Lock()
+        self._start_values = [0.0] * channels
+        self._target_values = [0.0] * channels
+        self._fade_start = 0.0
+        self._fade_duration = 0.0
+
+        self._last_send = 0.0
+        self._next_tick = 0.0
+        self._thread = None
+
+        # Compteurs de diagnostic
+        self.sent = 0
+        self.skipped = 0
+        self.errors = 0
+
+    # === Cibles (appelé depuis la détection) ===
+    def set(self, values, fade=0.0):
+        """Fixe la cible de certains canaux ({canal: 0-255}), atteinte en `fade` secondes"""
+        with self._lock:
+            if all(self._target_values[channel] == value for channel, value in values.items()):
+                return
+            now = time.monotonic()
+            # Le nouveau fondu part des valeurs affichées à cet instant
+            self._start_values = self._interpolate(now)
+            for channel, value in values.items():
+                self._target_values[channel] = float(max(0, min(255, value)))
+            self._fade_start = now
+            self._fade_duration = fade
+
+    def _interpolate(self, now):
+        if self._fade_duration <= 0:
+            return list(self._target_values)
+        progress = min(1.0, (now - self._fade_start) / self._fade_duration)
+        return [start + (target - start) * progress
+                for start, target in zip(self._start_values, self._target_values)]
+
+    # === Boucle OLA ===
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="DmxOutput", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        self._next_tick = time.monotonic()
+        self.wrapper.AddEvent(0, self._tick)
+        try:
+            self.wrapper.Run()
+        except Exception as e:
+            self.logger.error(f"Boucle OLA arrêtée : {e}")
+
+    def _tick(self):
+        now = time.monotonic()
+        with self._lock:
+            values = self._interpolate(now)
+        for channel, value in enumerate(values):
+            self._back[channel] = int(round(value))
+
+        if self._back != self._front or now - self._last_send >= self.keepalive:
+            self.client.SendDmx(self.universe, self._back, self._on_sent)
+            self._front, self._back = self._back, self._front
+            self._last_send = now
+            self.sent += 1
+        else:
+            self.skipped += 1
+
+        # Rythme fixe : l'échéance suivante ne dérive pas avec la durée du tick
+        self._next_tick += self.interval
+        if self._next_tick < now:
+            self._next_tick = now + self.interval
+        self.wrapper.AddEvent(int((self._next_tick - now) * 1000), self._tick)
+
+    def _on_sent(self, status):
+        if not status.Succeeded():
+            self.errors += 1
+            self.logger.error(f"Erreur d'envoi DMX : {status.message}")
+
+    def stop(self):
+        """Arrête la boucle OLA (depuis n'importe quel thread)"""
+        self.wrapper.Execute(self.wrapper.Stop)
+        if self._thread:
+            self._thread.join(timeout=1)
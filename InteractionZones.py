@@ -0,0 +1,123 @@
+import time
+
+ZONE_CONTACT = 0
+ZONE_APPROCHE = 1
+
+ZONE_LABELS = {
+    ZONE_CONTACT: "Zone contact",
+    ZONE_APPROCHE: "Zone approche",
+    None: "Hors zone",
+}
+
+# === Préchauffage prédictif ===
+PREWARM_DISTANCE = 5.5   # m, dans la portée du corridor (6 m), juste au-delà de la zone d'approche
+PREWARM_MIN_SPEED = 0.3  # m/s, vitesse d'approche minimale (en deçà : passant ou immobile)
+PREWARM_HORIZON = 6.0    # s, délai estimé avant la zone de contact en deçà duquel l'Oracle se prépare
+
+
+class ZoneTracker:
+    """Zones d'interaction (contact, approche, hors zone) et commandes Oracle associées
+
+    Un changement de zone n'est validé qu'après `stability_duration` secondes ;
+    les commandes sont transmises à on_command(commande).
+    """
+    def __init__(self, contact_limit, approach_limit, stability_duration, on_command):
+        self.contact_limit = contact_limit
+        self.approach_limit = approach_limit
+        self.stability_duration = stability_duration
+        self.on_command = on_command
+
+        self.current_zone = None
+        self.previous_zone = None
+        self.zone_sequence = []
+        self.last_zone_change_time = 0
+
+    def classify(self, distance):
+        if distance < self.contact_limit:
+            return ZONE_CONTACT
+        if distance < self.approach_limit:
+            return ZONE_APPROCHE
+        return None
+
+    def update(self, distance, current_time=None):
+        """Met à jour la zone avec la distance de la cible (en m) et renvoie le libellé de la zone mesurée"""
+        if current_time is None:
+            current_time = time.time()
+        new_zone = self.classify(distance)
+
+        if new_zone != self.current_zone:
+            if current_time - self.last_zone_change_time >= self.stability_duration:
+                # Met à jour la séquence
+                if new_zone is not None and (not self.zone_sequence or self.zone_sequence[-1] != new_zone):
+                    self.zone_sequence.append(new_zone)
+                elif new_zone is None and (not self.zone_sequence or self.zone_sequence[-1] is not None):
+                    self.zone_sequence.append(None)
+
+                # Ne garde que les 3 dernières zones
+                if len(self.zone_sequence) > 3:
+                    self.zone_sequence = self.zone_sequence[-3:]
+
+                # Déclenche la commande seulement si la séquence 0 → 1 → None est atteinte
+                if self.zone_sequence == [ZONE_CONTACT, ZONE_APPROCHE, None]:
+                    self.on_command("departure")
+                    self.zone_sequence.clear()
+
+                # Commandes habituelles
+                if self.current_zone is None and new_zone == ZONE_APPROCHE:
+                    self.on_command("engage")
+                elif self.current_zone == ZONE_CONTACT and new_zone != ZONE_CONTACT:
+                    self.on_command("stop")
+                elif new_zone == ZONE_CONTACT:
+                    self.on_command("start")
+
+                self.previous_zone = self.current_zone
+                self.current_zone = new_zone
+                self.last_zone_change_time = current_time
+        else:
+            self.last_zone_change_time = current_time
+
+        return ZONE_LABELS[new_zone]
+
+
+class ApproachPredictor:
+    """Annonce un visiteur qui se dirige vers l'Oracle avant qu'il n'entre en zone de contact
+
+    À partir de la vitesse radiale de la cible suivie (VisitorTracker), estime le
+    délai avant la zone de contact et envoie on_command("prewarm", params) une
+    seule fois par approche. Le prédicteur est réarmé quand la cible change de
+    piste, disparaît (reset()) ou ressort de la zone d'approche après y être entrée.
+    """
+    def __init__(self, contact_limit, approach_limit, on_command, max_distance=PREWARM_DISTANCE,
+                 min_speed=PREWARM_MIN_SPEED, horizon=PREWARM_HORIZON):
+        self.contact_limit = contact_limit
+        self.approach_limit = approach_limit
+        self.on_command = on_command
+        self.max_distance = max_distance
+        self.min_speed = min_speed
+        self.horizon = horizon
+        self.fired_id = None   # Piste pour laquelle "prewarm" a été envoyé
+        self.entered = False   # Cette piste est entrée dans la zone d'approche depuis
+
+    def reset(self):
+        self.fired_id = None
+        self.entered = False
+
+    def update(self, track_id, distance, radial_velocity):
+        """Piste cible, distance (m) et vitesse radiale (m/s, négative en approche) ; renvoie le délai estimé (s) ou None"""
+        if track_id != self.fired_id:
+            self.reset()
+        elif distance < self.approach_limit:
+            self.entered = True
+        elif self.entered:
+            # La cible ressort de la zone d'approche : sa prochaine approche sera annoncée
+            self.reset()
+
+        speed = -radial_velocity
+        if distance >= self.max_distance or distance < self.contact_limit or speed < self.min_speed:
+            return None
+        eta = (distance - self.contact_limit) / speed
+        if self.fired_id is None and eta <= self.horizon:
+            self.fired_id = track_id
+            self.entered = distance < self.approach_limit
+            self.on_command("prewarm", {"eta": round(eta, 2), "speed": round(speed, 2)})
+        return eta
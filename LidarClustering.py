@@ -0,0 +1,187 @@
+import math
+
+import numpy as np
+
+# === Paramètres de clustering ===
+MIN_POINTS_CLUSTER = 3  # Nombre minimal de points pour considérer un cluster
+BASE_DISTANCE_THRESHOLD = 0.5  # Seuil de base pour le clustering (en unités)
+FAR_DISTANCE = 20  # Au-delà (2m), on compare les points par distance d'arc
+DEFAULT_DISTANCE_RANGES = [(0.5, 10), (10, 20), (20, 30), (30, 60)]
+
+
+def distance_factor(distance):
+    """Facteur d'adaptation du seuil : 1 jusqu'à 1m, puis proportionnel à la distance"""
+    return np.maximum(1.0, np.asarray(distance, dtype=np.float64) / 10)
+
+
+# Fonction pour regrouper les points en clusters avec adaptation à la distance
+def cluster_points(points, distance_ranges):
+    all_clusters = []
+
+    # Traiter chaque plage de distance séparément
+    for dist_min, dist_max in distance_ranges:
+        # Filtrer les points dans cette plage
+        range_points = [(d, a, c) for d, a, c in points if dist_min <= d < dist_max]
+        if not range_points:
+            continue
+
+        # Calculer le facteur d'adaptation pour cette plage
+        distance_factor = max(1.0, (dist_min + dist_max) / 20)  # Moyenne de la plage divisée par 2m
+
+        # Ajuster les paramètres en fonction de la distance
+        distance_threshold = BASE_DISTANCE_THRESHOLD * distance_factor
+        min_points = max(2, int(MIN_POINTS_CLUSTER / (distance_factor**0.5)))
+
+        # Trier par angle pour mieux regrouper les points voisins
+        sorted_points = sorted(range_points, key=lambda x: x[1])
+
+        clusters = []
+        current_cluster = []
+
+        for dist, angle, conf in sorted_points:
+            if not current_cluster:
+                current_cluster.append((dist, angle, conf))
+            else:
+                # Vérifier si ce point est proche d'un point du cluster courant
+                close_to_cluster = False
+
+                for cluster_dist, cluster_angle, _ in current_cluster:
+                    # Pour les points lointains, utiliser une approche basée sur l'angle
+                    if dist > 20:  # Au-delà de 2m
+                        # Calculer la différence d'angle (en tenant compte de la circularité)
+                        angle_diff = abs(angle - cluster_angle)
+                        angle_diff = min(angle_diff, 2*math.pi - angle_diff)
+
+                        # Convertir en distance d'arc à la distance actuelle
+                        arc_distance = angle_diff * dist
+
+                        if arc_distance < distance_threshold * 2:  # Plus tolérant pour les points lointains
+                            close_to_cluster = True
+                            break
+                    else:
+                        # Pour les points proches, utiliser la distance euclidienne standard
+                        dx = dist * math.cos(angle) - cluster_dist * math.cos(cluster_angle)
+                        dy = dist * math.sin(angle) - cluster_dist * math.sin(cluster_angle)
+                        distance_between_points = math.sqrt(dx*dx + dy*dy)
+
+                        if distance_between_points < distance_threshold:
+                            close_to_cluster = True
+                            break
+
+                if close_to_cluster:
+                    current_cluster.append((dist, angle, conf))
+                else:
+                    if len(current_cluster) >= min_points:
+                        clusters.append(current_cluster)
+                    current_cluster = [(dist, angle, conf)]
+
+        # Ne pas oublier le dernier cluster
+        if current_cluster and len(current_cluster) >= min_points:
+            clusters.append(current_cluster)
+
+        all_clusters.extend(clusters)
+
+    return all_clusters
+
+
+def cluster_distance(distances, indices, n_points=3):
+    """Distance d'un cluster : moyenne de ses n points les plus proches, pour plus de stabilité"""
+    cluster_distances = np.sort(distances[indices])[:n_points]
+    return float(cluster_distances.mean())
+
+
+class LegacyClusterer:
+    """Moteur historique (cluster_points) : plages de distance fixes, comparaison O(n²)"""
+    def __init__(self, distance_ranges=None):
+        self.distance_ranges = distance_ranges or DEFAULT_DISTANCE_RANGES
+
+    def cluster(self, distances, angles, x=None, y=None):
+        """Renvoie la liste des clusters sous forme de tableaux d'indices"""
+        # L'index du point remplace la confiance, que cluster_points se contente de transporter
+        points = list(zip(distances.tolist(), angles.tolist(), range(len(distances))))
+        clusters = cluster_points(points, self.distance_ranges)
+        return [np.fromiter((index for _, _, index in cluster), dtype=np.intp, count=len(cluster))
+                for cluster in clusters]
+
+
+class AngularClusterer:
+    """Segmentation vectorisée par adjacence angulaire, avec seuil adaptatif continu
+
+    Les points sont triés par angle ; une coupure est placée entre deux voisins
+    lorsque le point n'est proche d'aucun des `lookback` points qui le précèdent.
+    Le seuil suit la distance de chaque point au lieu de plages fixes, si bien
+    qu'un objet à cheval sur 1m ou 2m n'est plus coupé en deux.
+    """
+    def __init__(self, base_threshold=BASE_DISTANCE_THRESHOLD, min_points=MIN_POINTS_CLUSTER,
+                 far_distance=FAR_DISTANCE, lookback=2):
+        self.base_threshold = base_threshold
+        self.min_points = min_points
+        self.far_distance = far_distance
+        self.lookback = lookback
+
+    def _close(self, d1, a1, x1, y1, d2, a2, x2, y2):
+        """Teste la proximité de deux ensembles de points, élément par élément"""
+        threshold = self.base_threshold * distance_factor(np.minimum(d1, d2))
+
+        # Points lointains : distance d'arc, plus tolérante
+        angle_diff = np.abs(a1 - a2)
+        angle_diff = np.minimum(angle_diff, 2 * math.pi - angle_diff)
+        far = (angle_diff * d1) < threshold * 2
+
+        # Points proches : distance euclidienne
+        near = np.hypot(x1 - x2, y1 - y2) < threshold
+
+        return np.where(d1 > self.far_distance, far, near)
+
+    def cluster(self, distances, angles, x=None, y=None):
+        """Renvoie la liste des clusters sous forme de tableaux d'indices"""
+        n = len(distances)
+        if n == 0:
+            return []
+        if x is None or y is None:
+            x = distances * np.cos(angles)
+            y = distances * np.sin(angles)
+
+        order = np.argsort(angles, kind='stable')
+        d, a, px, py = distances[order], angles[order], x[order], y[order]
+
+        # linked[i] : le point i rejoint le segment du point i-1
+        linked = np.zeros(n, dtype=bool)
+        for k in range(1, min(self.lookback, n - 1) + 1):
+            linked[k:] |= self._close(d[k:], a[k:], px[k:], py[k:],
+                                      d[:-k], a[:-k], px[:-k], py[:-k])
+
+        starts = np.flatnonzero(~linked)
+        labels = np.cumsum(~linked) - 1
+
+        # Fusion du premier et du dernier segment s'ils se touchent autour de 0°
+        if len(starts) > 1 and self._close(d[:1], a[:1], px[:1], py[:1],
+                                           d[-1:], a[-1:], px[-1:], py[-1:])[0]:
+            labels[labels == labels[-1]] = 0
+
+        counts = np.bincount(labels)
+        sums = np.bincount(labels, weights=d)
+        factors = distance_factor(sums[counts > 0] / counts[counts > 0])
+        min_points = np.maximum(2, (self.min_points / np.sqrt(factors)).astype(int))
+        kept = np.flatnonzero(counts > 0)[counts[counts > 0] >= min_points]
+        if len(kept) == 0:
+            return []
+
+        grouped = np.argsort(labels, kind='stable')
+        boundaries = np.cumsum(counts)
+        return [order[grouped[boundaries[label] - counts[label]:boundaries[label]]] for label in kept]
+
+
+CLUSTERING_ENGINES = {
+    "legacy": LegacyClusterer,
+    "angular": AngularClusterer,
+}
+
+
+def make_clusterer(name="angular", **params):
+    """Instancie le moteur de clustering demandé"""
+    try:
+        engine = CLUSTERING_ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Moteur de clustering inconnu: {name}")
+    return engine(**params)
@@ -0,0 +1,189 @@
+import logging
+import queue
+import threading
+
+import numpy as np
+
+from CalcLidarData import PACKET_HEADER, PACKET_VER_LEN, PACKET_LENGTH, check_packets, decode_packets
+from ScanAssembler import ScanAssembler
+from Metrics import metrics
+
+HEADER = bytes((PACKET_HEADER, PACKET_VER_LEN))
+
+
+class LidarReader:
+    """Lecture série par blocs avec tampon circulaire et resynchronisation sur l'en-tête 54 2C"""
+    def __init__(self, ser, buffer_size=64 * PACKET_LENGTH):
+        self.ser = ser
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+
+        # Compteurs de diagnostic
+        self.packets = 0         # Paquets valides renvoyés
+        self.dropped = 0         # Octets perdus (débordement du tampon ou bruit avant un en-tête)
+        self.corrupt = 0         # Paquets rejetés par le CRC
+        self.resync = 0          # Recherches d'en-tête après une perte d'alignement
+
+    def stats(self):
+        """Renvoie les compteurs de diagnostic"""
+        return {
+            "packets": self.packets,
+            "dropped": self.dropped,
+            "corrupt": self.corrupt,
+            "resync": self.resync,
+        }
+
+    def _fill(self):
+        """Lit en bloc tout ce qui est disponible sur le port série"""
+        data = self.ser.read(max(1, self.ser.in_waiting))
+        if not data:
+            return
+
+        size = len(self._buffer)
+        if len(data) > size:
+            self.dropped += len(data) - size
+            data = data[-size:]
+
+        # Ramener les données en attente au début du tampon si nécessaire
+        if self._end + len(data) > size:
+            pending = self._end - self._start
+            overflow = pending + len(data) - size
+            if overflow > 0:
+                # Tampon plein : on sacrifie les octets les plus anciens
+                self.dropped += overflow
+                self._start += overflow
+                pending -= overflow
+            self._view[:pending] = self._view[self._start:self._end]
+            self._start = 0
+            self._end = pending
+
+        self._view[self._end:self._end + len(data)] = data
+        self._end += len(data)
+
+    def poll(self):
+        """Lit le port et renvoie les paquets complets et valides, concaténés (éventuellement vide)"""
+        self._fill()
+        chunks = []
+
+        while self._end - self._start >= PACKET_LENGTH:
+            pos = self._buffer.find(HEADER, self._start, self._end)
+            if pos < 0:
+                # Garder le dernier octet, qui peut être le début d'un en-tête
+                self.dropped += self._end - self._start - 1
+                self._start = self._end - 1
+                self.resync += 1
+                break
+            if pos > self._start:
+                self.dropped += pos - self._start
+                self.resync += 1
+                self._start = pos
+
+            count = (self._end - pos) // PACKET_LENGTH
+            if count == 0:
+                break
+
+            # Paquets consécutifs alignés sur l'en-tête à partir de pos
+            raw = np.frombuffer(self._buffer, dtype=np.uint8, count=count * PACKET_LENGTH, offset=pos)
+            raw = raw.reshape(count, PACKET_LENGTH)
+            aligned = (raw[:, 0] == PACKET_HEADER) & (raw[:, 1] == PACKET_VER_LEN)
+            if not aligned.all():
+                count = int(np.argmin(aligned))
+
+            valid = check_packets(self._view[pos:pos + count * PACKET_LENGTH])
+            good = count if valid.all() else int(np.argmin(valid))
+
+            if good:
+                chunks.append(bytes(self._view[pos:pos + good * PACKET_LENGTH]))
+                self.packets += good
+            if good < count:
+                # CRC invalide : on saute l'en-tête fautif et on se resynchronise
+                self.corrupt += 1
+                self._start = pos + good * PACKET_LENGTH + 1
+            else:
+                self._start = pos + good * PACKET_LENGTH
+
+        return b"".join(chunks)
+
+    def __iter__(self):
+        """Produit les paquets un par un, au fil de la lecture"""
+        while True:
+            data = self.poll()
+            for offset in range(0, len(data), PACKET_LENGTH):
+                yield data[offset:offset + PACKET_LENGTH]
+
+
+class LidarAcquisition(threading.Thread):
+    """Thread d'acquisition : lit le port série en continu et publie des révolutions dans une file bornée"""
+    def __init__(self, ser, max_frames=4, clock=None):
+        super().__init__(name="LidarAcquisition", daemon=True)
+        self.reader = LidarReader(ser)
+        self.clock = clock  # Horloge des trames (time.monotonic() par défaut, LidarReplay.clock en rejeu)
+        self.assembler = ScanAssembler()
+        self.frames = queue.Queue(maxsize=max_frames)
+        self._stop_event = threading.Event()
+        self.error = None
+        self.logger = logging.getLogger('LidarAcquisition')
+
+        # Trames écartées parce que le consommateur n'a pas suivi (comptées depuis les deux threads)
+        self.dropped_frames = 0
+        self._dropped_lock = threading.Lock()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                packets = self.reader.poll()
+                if not packets:
+                    continue
+                now = self.clock() if self.clock else None
+                with metrics.span("decode"):
+                    frames = self.assembler.feed(decode_packets(packets), now)
+                for frame in frames:
+                    self._publish(frame)
+        except Exception as e:
+            self.error = e
+            self.logger.error(f"Erreur d'acquisition, arrêt de la lecture : {e}")
+
+    def _publish(self, frame):
+        """Ajoute une trame à la file, en écartant la plus ancienne si elle est pleine"""
+        while True:
+            try:
+                self.frames.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    self.release(self.frames.get_nowait())
+                    self._count_dropped()
+                except queue.Empty:
+                    pass
+
+    def get_latest(self, timeout=None):
+        """Attend une trame et renvoie la plus récente disponible (None si délai dépassé)
+
+        La trame renvoyée doit être rendue avec release() une fois traitée.
+        """
+        try:
+            frame = self.frames.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        while True:
+            try:
+                newer = self.frames.get_nowait()
+            except queue.Empty:
+                return frame
+            self.release(frame)
+            self._count_dropped()
+            frame = newer
+
+    def _count_dropped(self):
+        with self._dropped_lock:
+            self.dropped_frames += 1
+
+    def release(self, frame):
+        """Rend le tampon d'une trame traitée à l'assembleur"""
+        self.assembler.release(frame)
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        self.join(timeout)
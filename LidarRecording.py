@@ -0,0 +1,134 @@
+import mmap
+import struct
+import time
+
+# === Format d'enregistrement (.ldr, little-endian) ===
+# En-tête : "LDRC", version, 3 octets de bourrage, heure de début (time.time())
+# Puis une suite de blocs tels que lus sur le port série :
+# instant de lecture (s depuis le début), taille, octets bruts
+MAGIC = b"LDRC"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sB3xd")
+RECORD_HEADER = struct.Struct("<dI")
+
+
+class LidarRecorder:
+    """Enveloppe d'un port série qui enregistre chaque bloc lu, horodaté, dans un fichier .ldr
+
+    Les octets sont enregistrés bruts (bruit et paquets corrompus compris) : le
+    rejeu exerce aussi la resynchronisation de LidarReader.
+    """
+    def __init__(self, ser, path):
+        self.ser = ser
+        self.path = path
+        self._file = open(path, 'wb')
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, time.time()))
+        self._start = time.monotonic()
+        self.bytes = 0
+
+    @property
+    def in_waiting(self):
+        return self.ser.in_waiting
+
+    def read(self, size=1):
+        data = self.ser.read(size)
+        if data:
+            self._file.write(RECORD_HEADER.pack(time.monotonic() - self._start, len(data)))
+            self._file.write(data)
+            self.bytes += len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+        self.ser.close()
+
+
+class LidarReplay:
+    """Source de rejeu d'un enregistrement .ldr, utilisable à la place du port série
+
+    Le fichier est projeté en mémoire (mmap) et les blocs sont rendus sans copie
+    intermédiaire. `speed` = 1 rejoue en temps réel, 2 deux fois plus vite, et
+    0 aussi vite que possible (banc d'essai).
+    """
+    def __init__(self, path, speed=1.0, loop=False):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < FILE_HEADER.size:
+            raise ValueError(f"Enregistrement Lidar invalide : {path}")
+        magic, version, self.recorded_at = FILE_HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Enregistrement Lidar invalide : {path}")
+
+        self._view = memoryview(self._map)
+        self._offset = FILE_HEADER.size
+        self._pending = self._view[0:0]
+        self._time_base = 0.0     # Décalage des instants d'un tour de boucle à l'autre
+        self._last_time = 0.0
+        self._start = None
+        self.position = 0.0       # Instant enregistré du dernier bloc rendu (s)
+        self.finished = False
+
+    def _peek(self):
+        """Renvoie (instant, taille) du bloc suivant, ou None en fin de fichier"""
+        if self._offset + RECORD_HEADER.size > len(self._map):
+            if not self.loop or self._offset == FILE_HEADER.size:
+                return None
+            self._offset = FILE_HEADER.size
+            self._time_base += self._last_time
+        timestamp, size = RECORD_HEADER.unpack_from(self._map, self._offset)
+        return self._time_base + timestamp, size
+
+    @property
+    def in_waiting(self):
+        if len(self._pending):
+            return len(self._pending)
+        record = self._peek()
+        return record[1] if record else 0
+
+    def read(self, size=1):
+        if not len(self._pending):
+            record = self._peek()
+            if record is None:
+                self.finished = True
+                if self.speed:
+                    time.sleep(0.1)  # Comme un port série muet jusqu'à son délai d'attente
+                return b""
+            timestamp, length = record
+            if self._start is None:
+                self._start = time.monotonic() - timestamp / self.speed if self.speed else 0.0
+            if self.speed:
+                delay = self._start + timestamp / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            data_start = self._offset + RECORD_HEADER.size
+            self._pending = self._view[data_start:data_start + length]
+            self._offset = data_start + length
+            self._last_time = timestamp - self._time_base
+            self.position = timestamp
+
+        data = bytes(self._pending[:size])
+        self._pending = self._pending[size:]
+        return data
+
+    def clock(self):
+        """Horloge du capteur enregistré, à passer à ScanAssembler pour un rejeu accéléré"""
+        return self.position
+
+    def close(self):
+        self._pending.release()
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+
+def write_recording(path, chunks):
+    """Écrit un enregistrement à partir de (instant, octets), par exemple un flux synthétique"""
+    with open(path, 'wb') as f:
+        f.write(FILE_HEADER.pack(MAGIC, VERSION, time.time()))
+        for timestamp, data in chunks:
+            f.write(RECORD_HEADER.pack(timestamp, len(data)))
+            f.write(data)
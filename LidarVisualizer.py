@@ -0,0 +1,90 @@
+import math
+import sys
+import time
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+
+class LidarVisualizer:
+    """Affichage polaire léger : un seul nuage de points mis à jour par set_offsets et blitting
+
+    L'affichage est limité à `fps` images par seconde, indépendamment du
+    rythme de détection ; les appels supplémentaires à update() sont ignorés.
+    """
+    def __init__(self, corridor_width, max_distance, fps=10):
+        self.min_interval = 1.0 / fps if fps > 0 else 0.0
+        self._last_draw = 0.0
+        self._background = None
+
+        # === Configuration de la figure avec thème sombre ===
+        self.fig = plt.figure(figsize=(8, 8), facecolor='black')
+        self.ax = self.fig.add_subplot(111, projection='polar', facecolor='black')
+        self.ax.set_title('Lidar Scan', fontsize=18, color='white')
+
+        # Paramètres visuels pour contraste élevé
+        self.ax.set_theta_offset(math.pi)
+        self.ax.set_theta_direction(-1)
+        self.ax.tick_params(colors='white')
+        self.ax.xaxis.label.set_color('white')
+        self.ax.yaxis.label.set_color('white')
+        self.ax.grid(color='gray')
+
+        # Limiter l'affichage du graphique à max_distance unités
+        self.ax.set_rlim(0, max_distance)
+
+        # Bords du corridor (statiques, font partie de l'arrière-plan)
+        y_coords = np.linspace(0, max_distance, 100)
+        for x in (-corridor_width, corridor_width):
+            x_coords = np.full_like(y_coords, x)
+            self.ax.plot(np.arctan2(y_coords, x_coords), np.hypot(x_coords, y_coords), 'r-', linewidth=2)
+
+        # Artistes animés, redessinés à chaque image
+        self.points = self.ax.scatter([], [], c='deepskyblue', s=5, alpha=0.8, animated=True)
+        self.texts = {
+            "distance": self.fig.text(0.5, 0.05, "Distance minimale: -- m", fontsize=14, color='white', ha='center', va='center', bbox=dict(facecolor='black', alpha=0.7), animated=True),
+            "zone": self.fig.text(0.5, 0.01, "Zone actuelle: --", fontsize=14, color='white', ha='center', va='center', bbox=dict(facecolor='black', alpha=0.7), animated=True),
+            "rgb": self.fig.text(0.95, 0.85, "RGB : -- %", fontsize=12, color='red', ha='right', va='center', animated=True),
+            "uv": self.fig.text(0.95, 0.80, "UV  : -- %", fontsize=12, color='deepskyblue', ha='right', va='center', animated=True),
+        }
+
+        self.fig.canvas.mpl_connect('key_press_event', lambda event: sys.exit(1) if event.key == 'e' else None)
+        # L'arrière-plan est recapturé à chaque redessin complet (ex: redimensionnement)
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+        plt.show(block=False)
+        plt.pause(0.01)
+
+    def _on_draw(self, event):
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        self.ax.draw_artist(self.points)
+        for text in self.texts.values():
+            self.fig.draw_artist(text)
+
+    def update(self, angles, distances, status):
+        """Met à jour les points et les textes (clés de `texts`), si l'intervalle minimal est écoulé"""
+        now = time.monotonic()
+        if now - self._last_draw < self.min_interval:
+            self.idle()
+            return
+        self._last_draw = now
+
+        self.points.set_offsets(np.column_stack((angles, distances)))
+        for key, value in status.items():
+            self.texts[key].set_text(value)
+
+        canvas = self.fig.canvas
+        if self._background is None:
+            canvas.draw()
+        else:
+            canvas.restore_region(self._background)
+            self._draw_animated()
+            canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+    def idle(self):
+        """Traite les événements de la fenêtre sans redessiner"""
+        self.fig.canvas.flush_events()
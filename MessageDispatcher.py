@@ -0,0 +1,137 @@
+import logging
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# URL de votre nouveau service Render
+PORTAL_URL = "https://oracle-live-portal.onrender.com/api/message"
+
+# (connexion, lecture) en secondes
+PORTAL_TIMEOUT = (3.0, 10.0)
+
+
+class MessageDispatcher:
+    """Envoi des messages au serveur de visualisation depuis un thread dédié
+
+    send() ne fait que déposer le message dans une file bornée : la conversation
+    n'attend jamais le réseau. Le thread d'envoi vide la file par lots sur une
+    même connexion persistante (requests.Session), dans l'ordre d'arrivée, avec
+    délais d'attente et nouvelles tentatives espacées exponentiellement.
+    """
+    def __init__(self, url=PORTAL_URL, max_queue=200, batch_size=20, timeout=PORTAL_TIMEOUT,
+                 max_retries=3, backoff=0.5, session=None):
+        self.url = url
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.logger = logging.getLogger('MessageDispatcher')
+
+        self.session = session or requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=2))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=2))
+
+        self.messages = queue.Queue(maxsize=max_queue)
+
+        # Compteurs de diagnostic
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+        self._thread = threading.Thread(target=self._run, name="MessageDispatcher", daemon=True)
+        self._thread.start()
+
+    def send(self, message_type, content, audio_url=None):
+        """Met le message en file sans bloquer ; renvoie toujours True (le plus ancien est écarté si la file est pleine)"""
+        message = {
+            "type": message_type,  # "user", "system" ou "info"
+            "content": content,
+            "audio_url": audio_url
+        }
+        while True:
+            try:
+                self.messages.put_nowait(message)
+                return True
+            except queue.Full:
+                try:
+                    self.messages.get_nowait()
+                    self.messages.task_done()
+                    self.dropped += 1
+                    self.logger.warning("File d'envoi pleine, message le plus ancien écarté")
+                except queue.Empty:
+                    pass
+
+    def warm_up(self):
+        """Ouvre d'avance la connexion du pool (DNS, TCP, TLS) ; réveille aussi un portail en veille"""
+        try:
+            self.session.head(self.url, timeout=self.timeout)
+            return True
+        except requests.RequestException as e:
+            self.logger.warning(f"Préchauffage de la connexion au portail impossible : {e}")
+            return False
+
+    def _run(self):
+        while True:
+            batch = [self.messages.get()]
+            # Les messages accumulés pendant un envoi partent à la suite sur la même connexion
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.messages.get_nowait())
+                except queue.Empty:
+                    break
+
+            for message in batch:
+                try:
+                    if message is not None:
+                        self._deliver(message)
+                finally:
+                    self.messages.task_done()
+            if None in batch:
+                return
+
+    def _deliver(self, message):
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                response = self.session.post(self.url, json=message, timeout=self.timeout)
+                if response.status_code == 200:
+                    self.sent += 1
+                    self.logger.info("Message envoyé au serveur avec succès")
+                    return True
+                self.logger.error(f"Erreur lors de l'envoi au serveur: {response.status_code}")
+                # Erreur du client : inutile de réessayer (sauf limitation de débit)
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    break
+            except requests.RequestException as e:
+                self.logger.error(f"Erreur de connexion au serveur: {e}")
+        self.failed += 1
+        return False
+
+    def flush(self, timeout=5.0):
+        """Attend que la file soit vidée ; renvoie False si le délai est dépassé"""
+        deadline = time.monotonic() + timeout
+        with self.messages.all_tasks_done:
+            while self.messages.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.messages.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=5.0):
+        """Envoie les messages en attente puis ferme la session"""
+        if not self.flush(timeout):
+            self.logger.warning(f"{self.messages.qsize()} messages non envoyés à l'arrêt")
+        try:
+            self.messages.put_nowait(None)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=1)
+        self.session.close()
+
+    def stats(self):
+        return {"sent": self.sent, "failed": self.failed, "dropped": self.dropped, "pending": self.messages.qsize()}
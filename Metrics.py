@@ -0,0 +1,210 @@
+import http.server
+import logging
+import os
+import threading
+import time
+
+# Bornes des histogrammes de latence (s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Ports HTTP locaux par processus
+LIDAR_METRICS_PORT = 9108
+ORACLE_METRICS_PORT = 9109
+
+
+class Histogram:
+    """Histogramme cumulatif au format Prometheus (compteurs par borne, somme, nombre)"""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+
+class Span:
+    """Mesure la durée d'un bloc `with` sur l'horloge monotone"""
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.monotonic() - self.start)
+        return False
+
+
+class _NullSpan:
+    """Span inactif partagé : aucun appel d'horloge ni allocation quand les métriques sont désactivées"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    """Registre de métriques d'un processus : latences par étape, compteurs et jauges
+
+    Désactivé par défaut : span() renvoie alors un contexte vide et observe(),
+    increment(), set() et total() reviennent immédiatement. enable() démarre l'export
+    (endpoint HTTP local au format Prometheus et/ou fichier réécrit périodiquement).
+    """
+    def __init__(self, namespace="oracle"):
+        self.namespace = namespace
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._totals = {}
+        self._server = None
+        self._writer = None
+        self._stop_event = threading.Event()
+
+    # === Mesures ===
+    def span(self, stage):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, stage)
+
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, event, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[event] = self._counters.get(event, 0) + value
+
+    def set(self, name, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[name] = value
+
+    def total(self, name, value):
+        """Compteur cumulatif tenu ailleurs (par exemple les statistiques du lecteur), exporté en `name_total`"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._totals[name] = value
+
+    # === Export ===
+    def render(self):
+        """Texte au format d'exposition Prometheus"""
+        ns = self.namespace
+        lines = []
+        with self._lock:
+            if self._histograms:
+                lines.append(f"# TYPE {ns}_stage_seconds histogram")
+            for stage, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{ns}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{ns}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{ns}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'{ns}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            if self._histograms:
+                lines.append(f"# TYPE {ns}_stage_seconds_max gauge")
+            for stage, histogram in sorted(self._histograms.items()):
+                lines.append(f'{ns}_stage_seconds_max{{stage="{stage}"}} {histogram.max:.6f}')
+            if self._counters:
+                lines.append(f"# TYPE {ns}_events_total counter")
+            for event, value in sorted(self._counters.items()):
+                lines.append(f'{ns}_events_total{{event="{event}"}} {value}')
+            for name, value in sorted(self._totals.items()):
+                lines.append(f"# TYPE {ns}_{name}_total counter")
+                lines.append(f"{ns}_{name}_total {value}")
+            for name, value in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {ns}_{name} gauge")
+                lines.append(f"{ns}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def enable(self, port=None, path=None, interval=10.0, host="127.0.0.1"):
+        """Active la collecte ; exporte sur http://host:port/metrics et/ou dans `path` toutes les `interval` s"""
+        self.enabled = True
+        if port:
+            self._serve(host, port)
+        if path:
+            self._writer = threading.Thread(target=self._write_loop, args=(path, interval),
+                                            name="MetricsWriter", daemon=True)
+            self._writer.start()
+
+    def _serve(self, host, port):
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            self._server = http.server.ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            logging.getLogger('Metrics').error(f"Endpoint de métriques indisponible sur le port {port} : {e}")
+            return
+        threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True).start()
+        logging.getLogger('Metrics').info(f"Métriques exposées sur http://{host}:{port}/metrics")
+
+    def write(self, path):
+        """Écrit l'instantané des métriques de façon atomique (lisible à tout moment)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def _write_loop(self, path, interval):
+        while not self._stop_event.wait(interval):
+            try:
+                self.write(path)
+            except OSError as e:
+                logging.getLogger('Metrics').error(f"Écriture des métriques impossible : {e}")
+
+    def close(self):
+        self._stop_event.set()
+        if self._server:
+            self._server.shutdown()
+
+
+# Registre partagé du processus
+metrics = Metrics()
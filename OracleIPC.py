@@ -0,0 +1,140 @@
+import itertools
+import json
+import logging
+import os
+import select
+import socket
+import time
+
+# === CONFIGURATION ===
+COMMANDS_DIR = "/tmp/oracle_commands"
+COMMAND_SOCKET = "/tmp/oracle_commands.sock"
+MAX_MESSAGE_SIZE = 4096
+
+
+def encode_command(command, params=None, sequence=0):
+    cmd_data = {"command": command, "timestamp": time.time(), "seq": sequence}
+    if params:
+        cmd_data["params"] = params
+    return cmd_data
+
+
+class CommandSender:
+    """Envoie les commandes Oracle par socket Unix (datagrammes), avec repli sur les fichiers .cmd"""
+    def __init__(self, socket_path=COMMAND_SOCKET, commands_dir=COMMANDS_DIR):
+        self.socket_path = socket_path
+        self.commands_dir = commands_dir
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        # File du serveur pleine (lent ou bloqué) : BlockingIOError, donc repli fichier, plutôt
+        # que de bloquer la boucle de détection
+        self._socket.setblocking(False)
+        self._sequence = itertools.count()
+
+    def send(self, command, params=None):
+        """Envoie une commande, renvoie le canal utilisé ("socket" ou "file")"""
+        cmd_data = encode_command(command, params, next(self._sequence))
+        try:
+            self._socket.sendto(json.dumps(cmd_data).encode("utf-8"), self.socket_path)
+            return "socket"
+        except OSError:
+            # Serveur absent, saturé ou ancienne version : dépôt d'un fichier de commande
+            self._write_file(cmd_data)
+            return "file"
+
+    def _write_file(self, cmd_data):
+        os.makedirs(self.commands_dir, exist_ok=True)
+        cmd_id = int(cmd_data["timestamp"] * 1000)
+        cmd_file = os.path.join(self.commands_dir, f"cmd_{cmd_id}_{cmd_data['seq']}.cmd")
+        tmp_file = cmd_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(cmd_data, f)
+        os.chmod(tmp_file, 0o666)
+        # Renommage atomique : le serveur ne lit jamais un fichier à moitié écrit
+        os.replace(tmp_file, cmd_file)
+
+    def close(self):
+        self._socket.close()
+
+
+class CommandReceiver:
+    """Reçoit les commandes Oracle sur le socket Unix et surveille le répertoire de repli"""
+    def __init__(self, socket_path=COMMAND_SOCKET, commands_dir=COMMANDS_DIR):
+        self.socket_path = socket_path
+        self.commands_dir = commands_dir
+        os.makedirs(commands_dir, exist_ok=True)
+
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(socket_path)
+        os.chmod(socket_path, 0o666)
+
+        # Latence de déclenchement (envoi par main.py → réception ici), en secondes
+        self.latency_count = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def _record_latency(self, cmd_data):
+        latency = max(0.0, time.time() - cmd_data.get("timestamp", time.time()))
+        self.latency_count += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        cmd_data["latency"] = latency
+        logging.info(f"Commande reçue: {cmd_data.get('command')} (latence {latency * 1000:.1f} ms)")
+
+    def latency_stats(self):
+        mean = self.latency_total / self.latency_count if self.latency_count else 0.0
+        return {"count": self.latency_count, "mean": mean, "max": self.latency_max}
+
+    def _read_socket(self):
+        commands = []
+        while True:
+            try:
+                data = self._socket.recv(MAX_MESSAGE_SIZE, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                return commands
+            try:
+                cmd_data = json.loads(data.decode("utf-8"))
+            except ValueError as e:
+                logging.error(f"Commande invalide ignorée: {e}")
+                continue
+            if not isinstance(cmd_data, dict):
+                logging.error(f"Commande invalide ignorée: {cmd_data!r}")
+                continue
+            commands.append(cmd_data)
+
+    def _read_files(self):
+        commands = []
+        for cmd_file in sorted(f for f in os.listdir(self.commands_dir) if f.endswith(".cmd")):
+            cmd_path = os.path.join(self.commands_dir, cmd_file)
+            try:
+                with open(cmd_path, 'r') as f:
+                    cmd_data = json.load(f)
+                if isinstance(cmd_data, dict):
+                    commands.append(cmd_data)
+                else:
+                    logging.error(f"Fichier de commande invalide ignoré {cmd_file}: {cmd_data!r}")
+            except (OSError, ValueError) as e:
+                logging.error(f"Fichier de commande illisible {cmd_file}: {e}")
+            try:
+                os.remove(cmd_path)
+            except FileNotFoundError:
+                pass
+        return commands
+
+    def receive(self, timeout=0.2):
+        """Attend jusqu'à `timeout` secondes et renvoie les commandes reçues, dans l'ordre d'envoi"""
+        ready, _, _ = select.select([self._socket], [], [], timeout)
+        commands = self._read_socket() if ready else []
+        commands.extend(self._read_files())
+        commands.sort(key=lambda cmd_data: cmd_data.get("timestamp", 0))
+        for cmd_data in commands:
+            self._record_latency(cmd_data)
+        return commands
+
+    def close(self):
+        self._socket.close()
+        try:
+            os.remove(self.socket_path)
+        except FileNotFoundError:
+            pass
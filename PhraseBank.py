@@ -0,0 +1,168 @@
+import logging
+import os
+import random
+import threading
+
+METADATA_FILE = "_metadata.txt"
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg')
+
+
+def decode_filename(filename):
+    if filename.endswith('.mp3'):
+        filename = filename[:-4]
+    if '_' in filename and filename.split('_')[0].isdigit():
+        filename = filename[filename.index('_')+1:]
+
+    special_codes = {
+        "_DOT_": ".", "_COMMA_": ",", "_SEMICOLON_": ";", "_COLON_": ":",
+        "_QUESTION_": "?", "_EXCLAMATION_": "!", "_APOSTROPHE_": "'", "_QUOTE_": '"',
+        "_DASH_": "-", "_AT_": "@", "_AND_": "&", "_OPENPAR_": "(", "_CLOSEPAR_": ")",
+        "_PERCENT_": "%", "_PLUS_": "+", "_EQUAL_": "=", "_SLASH_": "/",
+        "_BACKSLASH_": "\\", "_STAR_": "*", "_TILDE_": "~", "_LESS_": "<",
+        "_GREATER_": ">", "_OPENSQ_": "[", "_CLOSESQ_": "]", "_OPENCURL_": "{",
+        "_CLOSECURL_": "}", "_PIPE_": "|", "_CARET_": "^", "_DOLLAR_": "$",
+        "_HASH_": "#", "_BACKTICK_": "`"
+    }
+
+    for code, char in special_codes.items():
+        filename = filename.replace(code, char)
+    filename = filename.replace("_", " ")
+    for p in ['.', ',', ';', ':', '!', '?']:
+        filename = filename.replace(f" {p}", p)
+    filename = filename.replace(" ' ", "'")
+    return filename
+
+
+def read_metadata(directory):
+    """Lit _metadata.txt (paires « Fichier: » / « Phrase: ») et renvoie {fichier: phrase}"""
+    path = os.path.join(directory, METADATA_FILE)
+    phrases = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            current_file = None
+            for line in f:
+                line = line.strip()
+                if line.startswith("Fichier:"):
+                    current_file = line[len("Fichier:"):].strip()
+                elif line.startswith("Phrase:") and current_file:
+                    phrases[current_file] = line[len("Phrase:"):].strip().strip('"')
+                    current_file = None
+    except FileNotFoundError:
+        pass
+    return phrases
+
+
+class Phrase:
+    def __init__(self, path, text, sound=None, mtime=0):
+        self.path = path
+        self.text = text
+        self.sound = sound  # pygame.mixer.Sound décodé en mémoire, ou None
+        self.mtime = mtime
+
+
+class PhraseCategory:
+    """Phrases d'un répertoire, préchargées, tirées sans répétition"""
+    def __init__(self, directory, preload=True):
+        self.directory = directory
+        self.preload = preload
+        self.phrases = []
+        self._deck = []
+        self._last = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _scan_signature(self):
+        """Empreinte du répertoire (noms et dates de modification) pour détecter les changements"""
+        try:
+            entries = os.scandir(self.directory)
+        except FileNotFoundError:
+            return None
+        with entries:
+            return tuple(sorted((entry.name, entry.stat().st_mtime_ns) for entry in entries))
+
+    def load(self):
+        """(Re)charge les phrases du répertoire ; renvoie True si quelque chose a changé"""
+        signature = self._scan_signature()
+        if signature == self._signature:
+            return False
+
+        metadata = read_metadata(self.directory)
+        # Les sons déjà décodés sont conservés si le fichier n'a pas changé
+        previous = {(phrase.path, phrase.mtime): phrase.sound for phrase in self.phrases}
+        phrases = []
+        for name, mtime in signature or ():
+            if not name.endswith(AUDIO_EXTENSIONS):
+                continue
+            path = os.path.join(self.directory, name)
+            text = metadata.get(name) or decode_filename(name)
+            sound = previous.get((path, mtime)) or self._load_sound(path)
+            phrases.append(Phrase(path, text, sound, mtime))
+
+        with self._lock:
+            self.phrases = phrases
+            self._deck = []
+            self._signature = signature
+        logging.info(f"{len(phrases)} phrases chargées depuis {self.directory}")
+        return True
+
+    def _load_sound(self, path):
+        if not self.preload:
+            return None
+        try:
+            import pygame
+            return pygame.mixer.Sound(path)
+        except Exception as e:
+            logging.warning(f"Préchargement impossible pour {path}: {e}")
+            return None
+
+    def next(self):
+        """Tire la phrase suivante : chaque phrase est jouée une fois avant tout nouveau tirage"""
+        with self._lock:
+            if not self.phrases:
+                return None
+            if not self._deck:
+                self._deck = list(self.phrases)
+                random.shuffle(self._deck)
+                # Pas deux fois la même phrase à la jonction de deux tirages
+                if len(self._deck) > 1 and self._deck[-1] is self._last:
+                    self._deck[0], self._deck[-1] = self._deck[-1], self._deck[0]
+            self._last = self._deck.pop()
+            return self._last
+
+
+class PhraseBank:
+    """Banque de phrases préenregistrées (bienvenue, engagement, au revoir), indexée par répertoire"""
+    def __init__(self, directories, preload=True, watch_interval=5.0):
+        self.categories = {directory: PhraseCategory(directory, preload) for directory in directories}
+        self.watch_interval = watch_interval
+        self._stop_event = threading.Event()
+        self._watcher = None
+
+    def load(self):
+        for category in self.categories.values():
+            category.load()
+
+    def next(self, directory):
+        """Renvoie la prochaine Phrase d'un répertoire (None s'il est vide)"""
+        category = self.categories.get(directory)
+        if category is None:
+            category = self.categories[directory] = PhraseCategory(directory)
+            category.load()
+        return category.next()
+
+    def start_watching(self):
+        """Surveille les répertoires en arrière-plan et recharge ceux qui ont changé"""
+        if self._watcher is None and self.watch_interval:
+            self._watcher = threading.Thread(target=self._watch, name="PhraseBankWatcher", daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        while not self._stop_event.wait(self.watch_interval):
+            for category in list(self.categories.values()):
+                try:
+                    category.load()
+                except Exception as e:
+                    logging.error(f"Erreur de rechargement des phrases {category.directory}: {e}")
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,82 @@
+import re
+
+# Mots qui ouvrent une question en français (« que » et « qu' » sont traités à part)
+QUESTION_WORDS = {
+    "est-ce", "qui", "quoi", "quel", "quelle", "quels", "quelles",
+    "comment", "pourquoi", "où", "quand", "combien", "lequel", "laquelle", "lesquels", "lesquelles",
+}
+
+# « que » n'ouvre une question que suivi d'une inversion ou de « est-ce » (« que la lumière soit »)
+QUE_WORDS = {"que", "qu"}
+
+# « est-ce » en tête, avec ou sans « qu' », trait d'union souvent perdu par la transcription
+EST_CE = re.compile(r"(?:qu'?\s*)?est[- ]ce\b", re.IGNORECASE)
+
+# Inversion sujet-verbe (« vois-tu », « peux-tu », « sais-je », « va-t-il »...), sans « allez-vous-en »
+INVERSION = re.compile(r"\b(\w+)-(t-)?(?:je|tu|il|elle|on|nous|vous|ils|elles)\b(?!-)", re.IGNORECASE)
+
+# Terminaisons d'un verbe conjugué devant le pronom inversé (sans « -t- » euphonique)
+VERB_ENDING = re.compile(r"(?:s|x|t|d|z|ai)$", re.IGNORECASE)
+
+# Noms composés qui ressemblent à une inversion
+COMPOUND_NOUNS = {"rendez-vous"}
+
+# Déterminants : le mot composé qui les suit est un nom (« un rendez-vous »)
+DETERMINERS = {
+    "le", "la", "les", "l", "un", "une", "des", "du", "au", "aux", "ce", "cet", "cette", "ces",
+    "mon", "ton", "son", "ma", "ta", "sa", "mes", "tes", "ses", "notre", "votre", "nos", "vos", "leur", "leurs",
+}
+
+# « quoi » interrogatif n'importe où (« c'est quoi mon avenir »), sauf « de quoi » et « quoi faire »
+QUOI = re.compile(r"(?<!\bde )\bquoi\b(?!\s+\w+(?:er|ir|re)\b)", re.IGNORECASE)
+
+# Conjonctions précédées d'une virgule
+COMMA_BEFORE = re.compile(r"\s+\b(mais|donc|car|alors|sinon|pourtant)\b", re.IGNORECASE)
+
+# Mots de liaison qui peuvent ouvrir la phrase (pas de virgule après eux : « et alors »)
+LEADING_CONJUNCTIONS = {"et", "ou", "ni", "mais", "donc", "car", "alors", "sinon", "pourtant"}
+
+
+def has_inversion(text):
+    """Vrai si le texte contient une inversion sujet-verbe (et non un nom composé comme « rendez-vous »)"""
+    for match in INVERSION.finditer(text):
+        if match.group(0).lower() in COMPOUND_NOUNS:
+            continue
+        if not match.group(2) and not VERB_ENDING.search(match.group(1)):
+            continue
+        previous = re.split(r"[\s']", text[:match.start()].lower().strip())[-1]
+        if previous in DETERMINERS:
+            continue
+        return True
+    return False
+
+
+def _comma(match):
+    before = match.string[:match.start()].lower().split()
+    if all(word in LEADING_CONJUNCTIONS for word in before):
+        # Conjonction en tête de phrase
+        return match.group(0)
+    return f", {match.group(1)}"
+
+
+def restore_punctuation(text):
+    """Ponctuation locale par règles : majuscule initiale, virgules usuelles et point ou point d'interrogation final"""
+    text = " ".join(text.split())
+    if not text:
+        return text
+
+    text = COMMA_BEFORE.sub(_comma, text)
+    text = text.replace(",,", ",")
+    text = text[0].upper() + text[1:]
+
+    if text[-1] in ".!?…":
+        return text
+
+    first_word = re.split(r"[\s']", text.lower(), maxsplit=1)[0]
+    if EST_CE.match(text) or has_inversion(text):
+        question = True
+    elif first_word in QUE_WORDS:
+        question = False
+    else:
+        question = first_word in QUESTION_WORDS or QUOI.search(text) is not None
+    return text + ("?" if question else ".")
@@ -0,0 +1,160 @@
+import collections
+import math
+import time
+
+import numpy as np
+
+from CalcLidarData import POINTS_PER_PACKET
+
+# Une révolution LD06 compte ~450 points à 10 Hz ; la marge couvre les vitesses lentes
+MAX_POINTS_PER_SCAN = 256 * POINTS_PER_PACKET
+
+
+class ScanFrame:
+    """Une révolution complète du Lidar, stockée dans des tableaux préalloués réutilisés"""
+    def __init__(self, capacity=MAX_POINTS_PER_SCAN):
+        self._angle = np.empty(capacity, dtype=np.float64)
+        self._distance = np.empty(capacity, dtype=np.float64)
+        self._confidence = np.empty(capacity, dtype=np.uint8)
+        self.reset()
+
+    @property
+    def capacity(self):
+        return len(self._angle)
+
+    @property
+    def Angle(self):
+        return self._angle[:self.count]
+
+    @property
+    def Distance(self):
+        return self._distance[:self.count]
+
+    @property
+    def Confidence(self):
+        return self._confidence[:self.count]
+
+    def reset(self):
+        self.count = 0
+        self.packets = 0
+        self.sequence = 0
+        self.complete = True
+        self.start_time = 0.0        # time.monotonic() à la réception du premier point
+        self.timestamp = 0.0         # time.monotonic() à la fin de la révolution
+        self.sensor_timestamp = 0    # Horodatage du capteur (ms) du premier paquet
+        self._speed_sum = 0.0
+
+    @property
+    def Speed(self):
+        """Vitesse de rotation moyenne rapportée par le capteur pendant la révolution"""
+        return self._speed_sum / self.packets if self.packets else 0.0
+
+    @property
+    def duration(self):
+        return self.timestamp - self.start_time
+
+    @property
+    def latency(self):
+        """Temps écoulé depuis la fin de la révolution"""
+        return time.monotonic() - self.timestamp
+
+
+class ScanAssembler:
+    """Découpe le flux de paquets en révolutions complètes grâce au passage de 360° à 0°"""
+    def __init__(self, capacity=MAX_POINTS_PER_SCAN):
+        self.capacity = capacity
+        self._free = collections.deque()
+        self._frame = None
+        self._last_angle = None
+        self._started = False
+        self._sequence = 0
+
+        # Compteurs de diagnostic
+        self.allocated = 0           # Nombre de tampons de trame créés
+        self.overflows = 0           # Révolutions tronquées faute de place
+
+    def _acquire(self):
+        """Récupère un tampon libre, ou en alloue un nouveau si tous sont en circulation"""
+        try:
+            frame = self._free.popleft()
+            frame.reset()
+        except IndexError:
+            frame = ScanFrame(self.capacity)
+            self.allocated += 1
+        return frame
+
+    def release(self, frame):
+        """Rend un tampon de trame au pool une fois que le consommateur l'a traité"""
+        if frame is not None:
+            self._free.append(frame)
+
+    def _append(self, batch, start, end, now):
+        """Copie les points [start:end) du lot dans la trame en cours"""
+        frame = self._frame
+        if frame.count == 0:
+            frame.start_time = now
+            frame.sensor_timestamp = int(batch.TimeStamp[start // POINTS_PER_PACKET])
+
+        n = min(end - start, frame.capacity - frame.count)
+        stop = start + n
+        frame._angle[frame.count:frame.count + n] = batch.Angle[start:stop]
+        frame._distance[frame.count:frame.count + n] = batch.Distance[start:stop]
+        frame._confidence[frame.count:frame.count + n] = batch.Confidence[start:stop]
+        frame.count += n
+
+        # Un paquet est attribué à la trame qui reçoit son premier point
+        first_packet = -(-start // POINTS_PER_PACKET)
+        last_packet = -(-stop // POINTS_PER_PACKET)
+        if last_packet > first_packet:
+            frame.packets += last_packet - first_packet
+            frame._speed_sum += float(batch.Speed[first_packet:last_packet].sum())
+        return n
+
+    def _finish(self, now, complete):
+        """Clôt la trame en cours et en démarre une nouvelle"""
+        frame = self._frame
+        frame.timestamp = now
+        frame.complete = complete
+        frame.sequence = self._sequence
+        self._sequence += 1
+        self._frame = self._acquire()
+        return frame
+
+    def feed(self, batch, now=None):
+        """Ajoute un LidarBatch et renvoie la liste des révolutions terminées"""
+        if now is None:
+            now = time.monotonic()
+        if self._frame is None:
+            self._frame = self._acquire()
+
+        angles = batch.Angle
+        if len(angles) == 0:
+            return []
+
+        # Un retour en arrière de plus d'un demi-tour marque le passage par 0°
+        previous = angles[0] if self._last_angle is None else self._last_angle
+        steps = np.diff(angles, prepend=previous)
+        wraps = np.flatnonzero(steps < -math.pi)
+        self._last_angle = angles[-1]
+
+        frames = []
+        start = 0
+        for wrap in wraps.tolist() + [len(angles)]:
+            position = start
+            while position < wrap:
+                position += self._append(batch, position, wrap, now)
+                if position < wrap:
+                    # Trame pleine sans passage par 0° (moteur ralenti ou arrêté)
+                    self.overflows += 1
+                    frames.append(self._finish(now, complete=False))
+            if wrap == len(angles):
+                break
+            if self._started:
+                frames.append(self._finish(now, complete=True))
+            else:
+                # La première révolution a commencé en cours de route : on l'écarte
+                self._frame.reset()
+                self._started = True
+            start = wrap
+
+        return frames
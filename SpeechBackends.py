@@ -0,0 +1,120 @@
+import json
+import os
+import threading
+
+import speech_recognition as sr
+
+# Modèle Vosk français (https://alphacephei.com/vosk/models), à décompresser dans models/
+VOSK_MODEL_PATH = "models/vosk-model-small-fr-0.22"
+
+# Les backends signalent une phrase incompréhensible par sr.UnknownValueError
+# et une panne du service par sr.RequestError, comme recognize_google.
+
+
+class GoogleBackend:
+    """Reconnaissance Google (réseau), sur la phrase complète"""
+    name = "google"
+    sample_rate = None  # Fréquence native du micro
+    streaming = False
+
+    def __init__(self, language='fr-FR'):
+        self.language = language
+        self._recognizer = sr.Recognizer()
+
+    def warm_up(self):
+        """Rien à précharger : le service est appelé à chaque phrase"""
+
+    def transcribe(self, audio):
+        return self._recognizer.recognize_google(audio, language=self.language)
+
+
+class VoskStream:
+    """Décodage incrémental d'une phrase : feed() à chaque bloc audio, finish() pour le texte final"""
+    def __init__(self, recognizer, on_partial=None):
+        self._recognizer = recognizer
+        self._segments = []
+        self._partial = ""
+        self.on_partial = on_partial
+
+    @property
+    def partial(self):
+        """Dernier résultat partiel (texte reconnu jusqu'ici)"""
+        return " ".join(self._segments + [self._partial]).strip()
+
+    def feed(self, data):
+        if self._recognizer.AcceptWaveform(data):
+            # Fin de segment détectée par Vosk : le texte du segment est définitif
+            self._segments.append(json.loads(self._recognizer.Result()).get("text", ""))
+            self._partial = ""
+        else:
+            partial = json.loads(self._recognizer.PartialResult()).get("partial", "")
+            if partial == self._partial:
+                return
+            self._partial = partial
+        if self.on_partial:
+            self.on_partial(self.partial)
+
+    def finish(self):
+        self._segments.append(json.loads(self._recognizer.FinalResult()).get("text", ""))
+        self._partial = ""
+        text = " ".join(segment for segment in self._segments if segment)
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class VoskBackend:
+    """Reconnaissance locale hors ligne (Vosk), avec résultats partiels pendant que le visiteur parle"""
+    name = "vosk"
+    sample_rate = 16000  # Fréquence des modèles Vosk : le micro est ouvert à cette fréquence
+    streaming = True
+
+    def __init__(self, model_path=VOSK_MODEL_PATH, on_partial=None):
+        try:
+            import vosk
+        except ImportError:
+            raise sr.RequestError("Module vosk non installé (pip install vosk)")
+        if not os.path.isdir(model_path):
+            raise sr.RequestError(f"Modèle Vosk introuvable : {model_path}")
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self.model_path = model_path
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.on_partial = on_partial
+
+    @property
+    def model(self):
+        """Modèle chargé au premier usage (plusieurs secondes sur le Pi), ou d'avance par warm_up()"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._vosk.Model(self.model_path)
+        return self._model
+
+    def warm_up(self):
+        self.model
+
+    def open_stream(self, sample_rate):
+        """Nouveau décodage incrémental pour une phrase (audio PCM 16 bits mono)"""
+        return VoskStream(self._vosk.KaldiRecognizer(self.model, sample_rate), self.on_partial)
+
+    def transcribe(self, audio):
+        stream = self.open_stream(self.sample_rate)
+        stream.feed(audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2))
+        return stream.finish()
+
+
+STT_BACKENDS = {
+    "google": GoogleBackend,
+    "vosk": VoskBackend,
+}
+
+
+def make_backend(name="google", **params):
+    """Instancie le backend de reconnaissance vocale demandé"""
+    try:
+        backend = STT_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Backend de reconnaissance vocale inconnu: {name}")
+    return backend(**params)
@@ -0,0 +1,234 @@
+import audioop
+import collections
+import logging
+import math
+import queue
+import threading
+import time
+
+import speech_recognition as sr
+
+
+class Utterance:
+    """Phrase captée par le micro, avec ses instants de début et de fin (time.monotonic())"""
+    def __init__(self, audio, start_time, end_time, barge_in=False, text=None, detected_time=None):
+        self.audio = audio
+        self.text = text  # Transcription décodée au fil de l'eau ("" si incompréhensible), ou None
+        self.start_time = start_time  # Début de l'audio, silence conservé avant la phrase compris
+        self.end_time = end_time
+        self.detected_time = start_time if detected_time is None else detected_time  # Voix détectée
+        self.barge_in = barge_in  # Commencée pendant que l'Oracle parlait
+
+
+class SpeechCapture:
+    """Session de capture longue durée : le micro reste ouvert et les phrases arrivent dans une file
+
+    Le bruit ambiant est calibré une seule fois à l'ouverture, puis le seuil
+    d'énergie s'adapte en continu (dynamic_energy_threshold). La détection de
+    voix continue pendant que l'Oracle parle : avec un lecteur (AudioPlayer),
+    le seuil est relevé de barge_in_ratio pour ne pas capter sa propre voix,
+    et une prise de parole suffisamment longue interrompt la lecture.
+    Avec un backend à résultats partiels (backend.streaming), chaque bloc audio
+    est décodé pendant que le visiteur parle : la transcription est prête dès
+    la fin de la phrase.
+    """
+    def __init__(self, pause_threshold=2.0, phrase_time_limit=30, calibration_duration=0.3, max_utterances=8,
+                 player=None, barge_in=True, barge_in_ratio=2.5, backend=None):
+        self.recognizer = sr.Recognizer()
+        # Ajuster ce paramètre pour augmenter le temps de pause toléré entre les mots
+        self.recognizer.pause_threshold = pause_threshold
+        self.recognizer.dynamic_energy_threshold = True
+        self.phrase_time_limit = phrase_time_limit
+        self.calibration_duration = calibration_duration
+        self.utterances = queue.Queue(maxsize=max_utterances)
+        self.player = player
+        self.barge_in = barge_in
+        self.barge_in_ratio = barge_in_ratio
+        self.backend = backend
+        self.logger = logging.getLogger('SpeechCapture')
+
+        self._thread = None
+        self._start_lock = threading.Lock()  # start() peut être appelé par le préchauffage et la conversation
+        self._running = threading.Event()
+        self._ready = threading.Event()
+
+    def start(self):
+        """Ouvre le micro et calibre le seuil (bloque jusqu'à la fin de la calibration)"""
+        with self._start_lock:
+            # Session déjà ouverte (par exemple par le préchauffage) : on attend seulement sa calibration
+            if not (self._thread and self._thread.is_alive()):
+                self._running.set()
+                self._ready.clear()
+                self._thread = threading.Thread(target=self._run, name="SpeechCapture", daemon=True)
+                self._thread.start()
+        self._ready.wait(timeout=5)
+
+    def stop(self):
+        self._running.clear()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def _run(self):
+        try:
+            sample_rate = self.backend.sample_rate if self.backend else None
+            with sr.Microphone(sample_rate=sample_rate) as source:
+                print("🎤 Ajustement au bruit ambiant...")
+                self.recognizer.adjust_for_ambient_noise(source, duration=self.calibration_duration)
+                self._ready.set()
+                self._listen(source)
+        except Exception as e:
+            self.logger.error(f"Erreur de capture audio : {e}")
+        finally:
+            self._ready.set()
+            self._running.clear()
+
+    def _oracle_speaking(self):
+        return self.player is not None and self.player.busy
+
+    def _listen(self, source):
+        """Découpe le flux en phrases (même logique que Recognizer.listen), sans jamais fermer le micro"""
+        recognizer = self.recognizer
+        seconds_per_buffer = source.CHUNK / source.SAMPLE_RATE
+        pause_buffer_count = math.ceil(recognizer.pause_threshold / seconds_per_buffer)
+        phrase_buffer_count = math.ceil(recognizer.phrase_threshold / seconds_per_buffer)
+        non_speaking_buffer_count = math.ceil(recognizer.non_speaking_duration / seconds_per_buffer)
+        max_buffer_count = math.ceil(self.phrase_time_limit / seconds_per_buffer) if self.phrase_time_limit else None
+
+        frames = collections.deque(maxlen=non_speaking_buffer_count)
+        speaking = False
+        barge_in = False
+        interrupted = False
+        pause_count = phrase_count = 0
+        start_time = detected_time = 0
+        stream = None
+
+        while self._running.is_set():
+            buffer = source.stream.read(source.CHUNK)
+            if not buffer:
+                break
+            energy = audioop.rms(buffer, source.SAMPLE_WIDTH)
+            oracle_speaking = self._oracle_speaking()
+            threshold = recognizer.energy_threshold
+            if oracle_speaking:
+                threshold *= self.barge_in_ratio
+
+            if not speaking:
+                frames.append(buffer)
+                if energy > threshold and (self.barge_in or not oracle_speaking):
+                    # Début de phrase : on conserve le court silence qui la précède
+                    speaking = True
+                    barge_in = oracle_speaking
+                    interrupted = False
+                    frames = collections.deque(frames)
+                    pause_count = phrase_count = 0
+                    detected_time = time.monotonic()
+                    start_time = detected_time - len(frames) * seconds_per_buffer
+                    stream = self._open_stream(source, frames)
+                elif recognizer.dynamic_energy_threshold and not oracle_speaking:
+                    # Adaptation continue du seuil (pas pendant que l'Oracle parle)
+                    damping = recognizer.dynamic_energy_adjustment_damping ** seconds_per_buffer
+                    target_energy = energy * recognizer.dynamic_energy_ratio
+                    recognizer.energy_threshold = recognizer.energy_threshold * damping + target_energy * (1 - damping)
+                continue
+
+            frames.append(buffer)
+            phrase_count += 1
+            if stream is not None:
+                stream = self._feed(stream, buffer)
+            if energy > threshold:
+                pause_count = 0
+            else:
+                pause_count += 1
+
+            # Prise de parole assez longue pendant que l'Oracle parle : on l'interrompt
+            if barge_in and not interrupted and oracle_speaking and phrase_count - pause_count >= phrase_buffer_count:
+                self.player.interrupt()
+                interrupted = True
+
+            too_long = max_buffer_count and phrase_count >= max_buffer_count
+            if pause_count <= pause_buffer_count and not too_long:
+                continue
+
+            # Fin de phrase
+            speaking = False
+            if phrase_count - pause_count >= phrase_buffer_count:
+                for _ in range(pause_count - non_speaking_buffer_count):
+                    frames.pop()  # Retire le silence final superflu
+                audio = sr.AudioData(b"".join(frames), source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+                self._put(Utterance(audio, start_time, time.monotonic(), barge_in, self._finish(stream),
+                                    detected_time))
+            frames = collections.deque(maxlen=non_speaking_buffer_count)
+            stream = None
+
+    # === Décodage au fil de l'eau ===
+    def _open_stream(self, source, frames):
+        """Ouvre un décodage incrémental et lui transmet le début de phrase déjà capté"""
+        if not (self.backend and self.backend.streaming):
+            return None
+        try:
+            stream = self.backend.open_stream(source.SAMPLE_RATE)
+        except Exception as e:
+            self.logger.error(f"Décodage incrémental impossible : {e}")
+            return None
+        for buffer in frames:
+            stream = self._feed(stream, buffer)
+        return stream
+
+    def _feed(self, stream, buffer):
+        """Décode un bloc ; en cas d'erreur, la phrase sera transcrite entière à la fin"""
+        if stream is None:
+            return None
+        try:
+            stream.feed(buffer)
+            return stream
+        except Exception as e:
+            self.logger.error(f"Erreur de décodage incrémental : {e}")
+            return None
+
+    def _finish(self, stream):
+        if stream is None:
+            return None
+        try:
+            return stream.finish()
+        except sr.UnknownValueError:
+            return ""
+        except Exception as e:
+            self.logger.error(f"Erreur de décodage incrémental : {e}")
+            return None
+
+    def _put(self, utterance):
+        """Ajoute une phrase à la file, en écartant la plus ancienne si elle est pleine"""
+        while True:
+            try:
+                self.utterances.put_nowait(utterance)
+                return
+            except queue.Full:
+                try:
+                    self.utterances.get_nowait()
+                except queue.Empty:
+                    pass
+
+    @property
+    def running(self):
+        return self._running.is_set()
+
+    def get_utterance(self, timeout=10, since=None):
+        """Attend la prochaine phrase commencée après `since`, ou ayant interrompu l'Oracle (None si délai dépassé)
+
+        La comparaison porte sur l'instant où la voix a été détectée, sans le
+        court silence conservé avant la phrase.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                # Attente par tranches courtes : un arrêt de la session débloque l'appelant
+                utterance = self.utterances.get(timeout=min(remaining, 0.5))
+            except queue.Empty:
+                if not self.running:
+                    return None
+                continue
+            if since is None or utterance.detected_time >= since or utterance.barge_in:
+                return utterance
@@ -0,0 +1,100 @@
+import collections
+import hashlib
+import logging
+import os
+import threading
+
+TTS_CACHE_DIR = "tts_cache"
+TTS_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+
+class TTSCache:
+    """Cache disque des synthèses vocales, adressé par le contenu (texte, langue, voix), avec plafond LRU
+
+    Chaque fichier est nommé d'après l'empreinte de son contenu et écrit de
+    façon atomique : un fichier publié n'est jamais réécrit, si bien qu'un
+    upload en arrière-plan ne peut pas lire un fichier en cours de remplacement.
+    """
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES, extension=".mp3"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # clé -> taille, du moins au plus récemment utilisé
+        self._size = 0
+
+        # Compteurs de diagnostic
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Reconstruit l'index LRU à partir des fichiers présents (ordre des dates de modification)"""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(self.extension):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-len(self.extension)], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._size += size
+
+    @staticmethod
+    def key(text, lang, voice):
+        return hashlib.sha256(f"{lang}\0{voice}\0{text}".encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.extension)
+
+    def get(self, text, lang, voice):
+        """Renvoie le chemin du fichier en cache, ou None"""
+        key = self.key(text, lang, voice)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        path = self.path(key)
+        try:
+            os.utime(path)  # Conserve l'ordre LRU d'un redémarrage à l'autre
+        except FileNotFoundError:
+            with self._lock:
+                self._size -= self._entries.pop(key, 0)
+            return None
+        return path
+
+    def store(self, text, lang, voice, writer):
+        """Produit le fichier avec writer(chemin_temporaire), le publie et renvoie son chemin"""
+        key = self.key(text, lang, voice)
+        path = self.path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            writer(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self._size += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep):
+        """Supprime les entrées les moins récemment utilisées au-delà du plafond"""
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, size = next(iter(self._entries.items()))
+            if key == keep:
+                break
+            del self._entries[key]
+            self._size -= size
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+            logging.getLogger('TTSCache').debug(f"Entrée évincée du cache TTS : {key}")
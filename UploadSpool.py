@@ -0,0 +1,232 @@
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+UPLOAD_SPOOL_DIR = "upload_spool"
+UPLOAD_FOLDER = "oracle_sounds"
+INDEX_FILE = "_uploaded.json"
+
+
+def file_digest(path):
+    """Empreinte SHA-256 du contenu d'un fichier"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CloudinaryUploader:
+    """Upload vers Cloudinary (la configuration cloudinary.config() doit être faite au préalable)"""
+    def __init__(self, folder=UPLOAD_FOLDER):
+        import cloudinary.uploader
+        self._uploader = cloudinary.uploader
+        self.folder = folder
+
+    def upload(self, path, public_id):
+        # public_id dérivé du contenu : un même son n'est jamais stocké deux fois
+        result = self._uploader.upload(
+            path,
+            resource_type="auto",
+            public_id=public_id,
+            folder=self.folder,
+            overwrite=False
+        )
+        return result['secure_url']
+
+
+class MockUploader:
+    """Uploader hors ligne pour les essais : renvoie une URL factice, avec latence et pannes simulées"""
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.uploads = []
+
+    def upload(self, path, public_id):
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("Uploader hors ligne (simulation)")
+        self.uploads.append(public_id)
+        return f"mock://{UPLOAD_FOLDER}/{public_id}"
+
+
+class UploadSpool:
+    """Uploads des réponses audio par un nombre fixe de workers, via un spool disque persistant
+
+    Chaque son est copié dans le spool sous son empreinte de contenu, avec les
+    messages qui l'attendent : un son déjà envoyé n'est pas ré-uploadé (index
+    des URL connues), et les sons restés en attente (coupure réseau, arrêt)
+    repartent au démarrage suivant. on_uploaded(message, url) est appelé pour
+    chaque message une fois l'URL connue, ou avec None si l'upload échoue.
+    """
+    def __init__(self, uploader, on_uploaded, directory=UPLOAD_SPOOL_DIR, workers=2, max_attempts=3, backoff=1.0):
+        self.uploader = uploader
+        self.on_uploaded = on_uploaded
+        self.directory = directory
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.logger = logging.getLogger('UploadSpool')
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Upload")
+        self._lock = threading.Condition()
+        self._pending = {}  # empreinte -> messages en attente de l'URL
+        self._closed = False
+
+        # Compteurs de diagnostic
+        self.uploaded = 0
+        self.deduplicated = 0
+        self.failed = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, INDEX_FILE)
+        self._index = self._load_index()
+        self._resume()
+
+    # === Index des sons déjà envoyés ===
+    def _load_index(self):
+        try:
+            with open(self._index_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_index(self):
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+
+    # === Spool disque ===
+    def _audio_path(self, digest):
+        return os.path.join(self.directory, digest + ".audio")
+
+    def _job_path(self, digest):
+        return os.path.join(self.directory, digest + ".json")
+
+    def _write_job(self, digest, messages):
+        tmp_path = self._job_path(digest) + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"messages": messages}, f, ensure_ascii=False)
+        os.replace(tmp_path, self._job_path(digest))
+
+    def _remove_job(self, digest):
+        for path in (self._job_path(digest), self._audio_path(digest)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _resume(self):
+        """Relance les uploads restés dans le spool lors d'une exécution précédente"""
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json") or name == INDEX_FILE:
+                continue
+            digest = name[:-len(".json")]
+            try:
+                with open(self._job_path(digest), 'r', encoding='utf-8') as f:
+                    messages = json.load(f)["messages"]
+            except (OSError, ValueError, KeyError):
+                self._remove_job(digest)
+                continue
+            if not os.path.exists(self._audio_path(digest)):
+                self._remove_job(digest)
+                continue
+            self._pending[digest] = messages
+            self._executor.submit(self._upload, digest)
+        if self._pending:
+            self.logger.info(f"{len(self._pending)} uploads repris depuis le spool")
+
+    # === API ===
+    def submit(self, audio_file, message):
+        """Confie un son et le message qui l'accompagne ; ne bloque pas sur le réseau"""
+        digest = file_digest(audio_file)
+
+        with self._lock:
+            url = self._index.get(digest)
+            if url is None and digest in self._pending:
+                # Même son déjà en cours d'envoi : le message attendra le même upload
+                self._pending[digest].append(message)
+                self._write_job(digest, self._pending[digest])
+                self.deduplicated += 1
+                return
+            if url is None:
+                if self._closed:
+                    self.logger.warning("Spool fermé, message envoyé sans audio")
+                else:
+                    # Copie dans le spool : le fichier d'origine peut être évincé du cache TTS entre-temps
+                    audio_path = self._audio_path(digest)
+                    try:
+                        os.link(audio_file, audio_path)
+                    except OSError:
+                        shutil.copyfile(audio_file, audio_path)
+                    self._pending[digest] = [message]
+                    self._write_job(digest, [message])
+                    self._executor.submit(self._upload, digest)
+                    return
+            else:
+                self.deduplicated += 1
+
+        self._notify([message], url)
+
+    def _upload(self, digest):
+        public_id = f"oracle_response_{digest[:24]}"
+        url = None
+        for attempt in range(self.max_attempts):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                url = self.uploader.upload(self._audio_path(digest), public_id)
+                self.logger.info(f"Audio uploadé vers Cloudinary: {url}")
+                break
+            except Exception as e:
+                self.logger.error(f"Erreur d'upload vers Cloudinary: {e}")
+
+        with self._lock:
+            messages = self._pending.pop(digest, [])
+            if url is not None:
+                self.uploaded += 1
+                self._index[digest] = url
+                self._save_index()
+                self._remove_job(digest)
+            else:
+                # Le son reste dans le spool (sans messages) et repartira au prochain démarrage
+                self.failed += 1
+                self._write_job(digest, [])
+            self._lock.notify_all()
+
+        self._notify(messages, url)
+
+    def _notify(self, messages, url):
+        for message in messages:
+            try:
+                self.on_uploaded(message, url)
+            except Exception as e:
+                self.logger.error(f"Erreur après upload : {e}")
+
+    def flush(self, timeout=10.0):
+        """Attend la fin des uploads en cours ; renvoie False si le délai est dépassé"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def close(self, timeout=10.0):
+        """Termine les uploads en cours ; ceux qui restent sont conservés dans le spool pour le prochain démarrage"""
+        with self._lock:
+            self._closed = True
+        if not self.flush(timeout):
+            self.logger.warning(f"{len(self._pending)} uploads laissés dans le spool")
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {"uploaded": self.uploaded, "deduplicated": self.deduplicated,
+                "failed": self.failed, "pending": len(self._pending)}
@@ -0,0 +1,148 @@
+import itertools
+
+import numpy as np
+
+# === Paramètres du suivi ===
+GATE_DISTANCE = 10.0      # Distance max (unités de 10cm) entre une piste prédite et un cluster
+MIN_HITS = 2              # Détections nécessaires avant qu'une piste soit confirmée
+MAX_MISSES = 5            # Révolutions sans détection avant suppression d'une piste
+PROCESS_NOISE = 5.0       # Bruit d'accélération du modèle à vitesse constante
+MEASUREMENT_NOISE = 0.5   # Bruit de mesure sur la position du centroïde
+SWITCH_MARGIN = 5.0       # Avance (unités de 10cm) nécessaire pour qu'une autre piste devienne la cible
+
+_H = np.array([[1.0, 0.0, 0.0, 0.0],
+               [0.0, 1.0, 0.0, 0.0]])
+
+
+class Detection:
+    """Un cluster de la révolution courante : centroïde x/y et distance (moyenne des 3 points les plus proches)"""
+    def __init__(self, x, y, distance):
+        self.x = x
+        self.y = y
+        self.distance = distance
+
+
+class Track:
+    """Piste d'un visiteur, filtrée par un Kalman à vitesse constante"""
+    def __init__(self, track_id, detection, timestamp):
+        self.id = track_id
+        self.state = np.array([detection.x, detection.y, 0.0, 0.0])
+        self.covariance = np.diag([MEASUREMENT_NOISE, MEASUREMENT_NOISE, 100.0, 100.0])
+        self.distance = detection.distance
+        self.timestamp = timestamp
+        self.hits = 1
+        self.misses = 0
+
+    @property
+    def x(self):
+        return self.state[0]
+
+    @property
+    def y(self):
+        return self.state[1]
+
+    @property
+    def velocity(self):
+        return self.state[2], self.state[3]
+
+    @property
+    def radial_velocity(self):
+        """Vitesse d'approche (négative quand le visiteur se rapproche du capteur)"""
+        norm = np.hypot(self.state[0], self.state[1])
+        if norm == 0:
+            return 0.0
+        return float((self.state[0] * self.state[2] + self.state[1] * self.state[3]) / norm)
+
+    @property
+    def confirmed(self):
+        return self.hits >= MIN_HITS
+
+    def predict(self, timestamp):
+        dt = max(0.0, timestamp - self.timestamp)
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = dt
+        dt2 = dt * dt
+        q = PROCESS_NOISE * np.array([[dt2 * dt2 / 4, 0, dt2 * dt / 2, 0],
+                                      [0, dt2 * dt2 / 4, 0, dt2 * dt / 2],
+                                      [dt2 * dt / 2, 0, dt2, 0],
+                                      [0, dt2 * dt / 2, 0, dt2]])
+        previous_range = np.hypot(self.state[0], self.state[1])
+        self.state = F @ self.state
+        self.covariance = F @ self.covariance @ F.T + q
+        self.timestamp = timestamp
+        # Distance extrapolée avec la position prédite (remplacée par la mesure dans update()) :
+        # une piste qui n'est plus vue ne reste pas figée à sa dernière distance
+        self.distance = max(0.0, self.distance + float(np.hypot(self.state[0], self.state[1]) - previous_range))
+
+    def update(self, detection):
+        measurement = np.array([detection.x, detection.y])
+        innovation = measurement - _H @ self.state
+        S = _H @ self.covariance @ _H.T + np.eye(2) * MEASUREMENT_NOISE
+        K = self.covariance @ _H.T @ np.linalg.inv(S)
+        self.state = self.state + K @ innovation
+        self.covariance = (np.eye(4) - K @ _H) @ self.covariance
+        self.distance = detection.distance
+        self.hits += 1
+        self.misses = 0
+
+
+class VisitorTracker:
+    """Suivi multi-cibles : association au plus proche voisin et identifiants persistants"""
+    def __init__(self, gate_distance=GATE_DISTANCE, max_misses=MAX_MISSES, switch_margin=SWITCH_MARGIN):
+        self.gate_distance = gate_distance
+        self.max_misses = max_misses
+        self.switch_margin = switch_margin
+        self.tracks = []
+        self.target_id = None
+        self._ids = itertools.count(1)
+
+    def update(self, detections, timestamp):
+        """Met à jour les pistes avec les détections d'une révolution, renvoie les pistes actives"""
+        for track in self.tracks:
+            track.predict(timestamp)
+
+        # Association gloutonne des paires (piste, détection) par distance croissante
+        unmatched_tracks = set(range(len(self.tracks)))
+        unmatched_detections = set(range(len(detections)))
+        if self.tracks and detections:
+            predicted = np.array([[track.x, track.y] for track in self.tracks])
+            measured = np.array([[d.x, d.y] for d in detections])
+            costs = np.hypot(predicted[:, None, 0] - measured[None, :, 0],
+                             predicted[:, None, 1] - measured[None, :, 1])
+            for flat in np.argsort(costs, axis=None):
+                t, d = (int(index) for index in np.unravel_index(flat, costs.shape))
+                if costs[t, d] > self.gate_distance:
+                    break
+                if t in unmatched_tracks and d in unmatched_detections:
+                    self.tracks[t].update(detections[d])
+                    unmatched_tracks.discard(t)
+                    unmatched_detections.discard(d)
+
+        for t in unmatched_tracks:
+            self.tracks[t].misses += 1
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+
+        for d in sorted(unmatched_detections):
+            self.tracks.append(Track(next(self._ids), detections[d], timestamp))
+
+        return self.tracks
+
+    def select_target(self):
+        """Piste suivie par la logique de zones
+
+        La cible actuelle est conservée tant qu'elle existe, sauf si une autre
+        piste confirmée est plus proche d'au moins `switch_margin`. Les pistes
+        vues dans la révolution courante passent avant celles qui ne sont plus
+        détectées (un visiteur parti ne garde pas la cible pendant MAX_MISSES révolutions).
+        """
+        confirmed = [track for track in self.tracks if track.confirmed]
+        if not confirmed:
+            self.target_id = None
+            return None
+        candidates = [track for track in confirmed if track.misses == 0] or confirmed
+        closest = min(candidates, key=lambda track: track.distance)
+        current = next((track for track in candidates if track.id == self.target_id), None)
+        if current is not None and current.distance - closest.distance < self.switch_margin:
+            return current
+        self.target_id = closest.id
+        return closest
@@ -0,0 +1,250 @@
+"""Banc d'essai du traitement Lidar, sans capteur ni affichage
+
+Usage :
+    python bench_lidar.py [--visitors N] [--repeat N] [--seed N]
+    python bench_lidar.py --replay capture.ldr       (enregistrement de main.py --record)
+    python bench_lidar.py --revolutions 200 --save synthetique.ldr
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from CalcLidarData import CRC_TABLE, PACKET_DTYPE, PACKET_HEADER, PACKET_LENGTH, PACKET_VER_LEN, POINTS_PER_PACKET, \
+    CalcLidarData, decode_packets
+from CorridorFilter import CorridorFilter
+from InteractionZones import ZoneTracker
+from LidarClustering import CLUSTERING_ENGINES, cluster_distance, make_clusterer
+from LidarReader import LidarReader
+from LidarRecording import LidarReplay, write_recording
+from ScanAssembler import ScanAssembler
+from VisitorTracker import Detection, VisitorTracker
+
+ANGLE_STEP = 0.8 * math.pi / 180  # Résolution angulaire typique du LD06 à 10 Hz
+
+
+def synthetic_scene(visitors, rng):
+    """Génère une scène filtrée : des visiteurs (arcs de ~40cm) et quelques points parasites"""
+    distances = []
+    angles = []
+    for _ in range(visitors):
+        distance = rng.uniform(5, 50)
+        center = rng.uniform(0.3, math.pi - 0.3)
+        width = 4.0 / distance  # 40cm vus à cette distance (unités de 10cm)
+        count = max(2, int(width / ANGLE_STEP))
+        angles.append(center + np.linspace(-width / 2, width / 2, count))
+        distances.append(distance + rng.normal(0, 0.1, count))
+    noise = max(5, visitors * 2)
+    angles.append(rng.uniform(0, math.pi, noise))
+    distances.append(rng.uniform(0.5, 60, noise))
+    return np.concatenate(distances), np.concatenate(angles)
+
+
+def time_call(function, repeat):
+    """Renvoie la durée moyenne d'un appel en millisecondes, et le dernier résultat"""
+    result = function()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def bench_clustering(visitor_counts, repeat, seed):
+    rng = np.random.default_rng(seed)
+    engines = {name: make_clusterer(name) for name in CLUSTERING_ENGINES}
+
+    print("=== Clustering ===")
+    print(f"{'visiteurs':>9} {'points':>7} " + " ".join(f"{name + ' (ms)':>14} {'clusters':>8}" for name in engines)
+          + f" {'min (m)':>15}")
+    for visitors in visitor_counts:
+        distances, angles = synthetic_scene(visitors, rng)
+        row = f"{visitors:>9} {len(distances):>7} "
+        minima = []
+        for name, engine in engines.items():
+            elapsed, clusters = time_call(lambda: engine.cluster(distances, angles), repeat)
+            row += f"{elapsed:>14.3f} {len(clusters):>8} "
+            closest = min((cluster_distance(distances, c) for c in clusters), default=float('inf'))
+            minima.append(f"{closest / 10:.2f}")
+        print(row + f"{'/'.join(minima):>15}")
+
+
+# === Flux synthétique ===
+PACKETS_PER_REVOLUTION = 38   # ~456 points par tour à 10 Hz
+SERIAL_CHUNK = 256            # Octets par lecture série simulée (non alignés sur les paquets)
+_CRC_TABLE_NP = np.frombuffer(CRC_TABLE, dtype=np.uint8)
+
+
+def synthetic_stream(revolutions, visitors, rng, frequency=10.0):
+    """Produit (instant, octets) d'un flux LD06 : un mur à 8 m et des visiteurs qui s'approchent dans le corridor"""
+    count = revolutions * PACKETS_PER_REVOLUTION
+    step = 360.0 / (PACKETS_PER_REVOLUTION * POINTS_PER_PACKET)
+    packets = np.zeros(count, dtype=PACKET_DTYPE)
+    packets['header'] = PACKET_HEADER
+    packets['ver_len'] = PACKET_VER_LEN
+    packets['speed'] = int(frequency * 360)
+
+    index = np.arange(count)
+    start_angle = (index % PACKETS_PER_REVOLUTION) * POINTS_PER_PACKET * step
+    packets['start_angle'] = np.round(start_angle * 100)
+    packets['end_angle'] = np.round(((start_angle + POINTS_PER_PACKET * step) % 360) * 100)
+    packets['timestamp'] = (index * 1000 / (frequency * PACKETS_PER_REVOLUTION)).astype(np.int64) % 30000
+
+    # Distances en mm, point par point
+    degrees = start_angle[:, None] + np.arange(POINTS_PER_PACKET) * step
+    revolution = (index // PACKETS_PER_REVOLUTION)[:, None]
+    distance = np.full(degrees.shape, 8000.0) + rng.normal(0, 10, degrees.shape)
+    for _ in range(visitors):
+        start, speed = rng.uniform(3000, 6000), rng.uniform(5, 20)   # mm, mm par tour
+        center = 90 + rng.uniform(-2, 2)
+        position = np.maximum(start - speed * revolution, 600)
+        width = np.degrees(400 / position) / 2   # 40 cm vus à cette distance
+        body = np.abs(degrees - center) <= width
+        distance = np.where(body, np.minimum(distance, position), distance)
+    packets['points']['distance'] = np.clip(distance, 0, 65535).astype(np.uint16)
+    packets['points']['confidence'] = 200
+
+    # CRC vectorisé sur les 46 premiers octets de chaque paquet
+    raw = packets.view(np.uint8).reshape(count, PACKET_LENGTH)
+    crc = np.zeros(count, dtype=np.uint8)
+    for column in range(PACKET_LENGTH - 1):
+        crc = _CRC_TABLE_NP[crc ^ raw[:, column]]
+    packets['crc'] = crc
+
+    data = packets.tobytes()
+    byte_time = 1.0 / (frequency * PACKETS_PER_REVOLUTION * PACKET_LENGTH)
+    for offset in range(0, len(data), SERIAL_CHUNK):
+        yield offset * byte_time, data[offset:offset + SERIAL_CHUNK]
+
+
+# === Pipeline complet ===
+# Mêmes réglages que main.py
+CORRIDOR_WIDTH = 3.00
+MAX_DISTANCE = 60
+MIN_CONFIDENCE = 10
+MIN_VALID_DISTANCE = 0.5
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def bench_pipeline(replay):
+    """Rejoue un flux au plus vite à travers la chaîne de main.py et mesure chaque étape"""
+    reader = LidarReader(replay)
+    assembler = ScanAssembler()
+    corridor_filter = CorridorFilter(CORRIDOR_WIDTH, MIN_VALID_DISTANCE, MAX_DISTANCE, MIN_CONFIDENCE)
+    engines = {name: make_clusterer(name) for name in CLUSTERING_ENGINES}
+    tracker = VisitorTracker()
+    commands = []
+    zones = ZoneTracker(2.0, 5.0, 0.5, commands.append)
+
+    stages = ["lecture", "décodage", "assemblage", "corridor"] + [f"cluster {name}" for name in engines] \
+        + ["suivi", "get_zone"]
+    timings = {stage: [] for stage in stages}
+    frames = 0
+    points = 0
+
+    def timed(stage, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        timings[stage].append((time.perf_counter() - start) * 1000)
+        return result
+
+    start = time.perf_counter()
+    while True:
+        data = timed("lecture", reader.poll)
+        if not data:
+            if replay.finished:
+                break
+            continue
+        batch = timed("décodage", decode_packets, data)
+        for frame in timed("assemblage", assembler.feed, batch, replay.clock()):
+            frames += 1
+            points += frame.count
+            corridor = timed("corridor", corridor_filter, frame.Angle, frame.Distance, frame.Confidence)
+
+            clusters = []
+            for name, engine in engines.items():
+                result = timed(f"cluster {name}", engine.cluster, corridor.distances, corridor.angles,
+                               corridor.x, corridor.y)
+                if name == "angular":
+                    clusters = result
+
+            def track():
+                detections = []
+                for cluster in clusters:
+                    avg_distance = cluster_distance(corridor.distances, cluster)
+                    if avg_distance >= MIN_VALID_DISTANCE:
+                        detections.append(Detection(float(corridor.x[cluster].mean()),
+                                                    float(corridor.y[cluster].mean()), avg_distance))
+                tracker.update(detections, frame.timestamp)
+                return tracker.select_target()
+            target = timed("suivi", track)
+
+            distance = target.distance / 10 if target is not None else float('inf')
+            timed("get_zone", zones.update, distance, frame.timestamp)
+            assembler.release(frame)
+    elapsed = time.perf_counter() - start
+
+    print(f"=== Pipeline ({replay.path}) ===")
+    print(f"{reader.packets} paquets en {elapsed:.2f} s : {reader.packets / elapsed:,.0f} paquets/s décodés, "
+          f"{frames / elapsed:,.1f} trames/s traitées ({frames} trames, {points / max(frames, 1):.0f} points/trame)")
+    print(f"Diagnostic lecteur : {reader.stats()}, commandes de zone : {commands}")
+    print(f"{'étape':>16} {'appels':>7} {'moy (ms)':>10} {'p95 (ms)':>10} {'max (ms)':>10}")
+    for stage in stages:
+        values = timings[stage]
+        if values:
+            print(f"{stage:>16} {len(values):>7} {np.mean(values):>10.3f} {percentile(values, 95):>10.3f} "
+                  f"{max(values):>10.3f}")
+
+
+def bench_decode(path, repeat):
+    """Décodage d'un paquet : CalcLidarData historique (chaîne hexadécimale) contre decode_packets par lot"""
+    replay = LidarReplay(path, speed=0)
+    reader = LidarReader(replay)
+    data = b""
+    while len(data) < 1000 * PACKET_LENGTH and not replay.finished:
+        data += reader.poll()
+    replay.close()
+    count = len(data) // PACKET_LENGTH
+    if not count:
+        return
+    hex_packets = [data[i + 2:i + PACKET_LENGTH].hex() for i in range(0, count * PACKET_LENGTH, PACKET_LENGTH)]
+
+    legacy, _ = time_call(lambda: [CalcLidarData(packet) for packet in hex_packets], repeat)
+    batch, _ = time_call(lambda: decode_packets(data[:count * PACKET_LENGTH]), repeat)
+    print(f"=== Décodage ({count} paquets) ===")
+    print(f"CalcLidarData : {legacy / count * 1000:8.2f} µs/paquet")
+    print(f"decode_packets: {batch / count * 1000:8.2f} µs/paquet (lot)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai du traitement Lidar")
+    parser.add_argument("--visitors", type=int, nargs="+", default=[1, 2, 5, 10, 20])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", metavar="FICHIER", help="Enregistrement .ldr à rejouer (sinon flux synthétique)")
+    parser.add_argument("--revolutions", type=int, default=300, help="Tours du flux synthétique")
+    parser.add_argument("--save", metavar="FICHIER", help="Conserve le flux synthétique (rejouable par main.py --replay)")
+    args = parser.parse_args()
+
+    bench_clustering(args.visitors, args.repeat, args.seed)
+    print()
+
+    path = args.replay
+    if path is None:
+        import os
+        import tempfile
+        path = args.save or os.path.join(tempfile.mkdtemp(), "synthetique.ldr")
+        write_recording(path, synthetic_stream(args.revolutions, 2, np.random.default_rng(args.seed)))
+
+    bench_decode(path, max(1, args.repeat // 10))
+    print()
+    replay = LidarReplay(path, speed=0)
+    bench_pipeline(replay)
+    replay.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+"""Banc d'essai du pipeline de conversation de l'Oracle
+
+Usage :
+    python bench_oracle.py punctuation [--llm]
+    python bench_oracle.py stt [--fixtures fixtures/stt] [--backends google vosk]
+    python bench_oracle.py portal [--messages 50] [--delay 0.05] [--failure-rate 0.1]
+    python bench_oracle.py uploads [--responses 40] [--delay 0.2] [--workers 2]
+    python bench_oracle.py startup [--repeat 3] [--warm-up]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from Punctuation import restore_punctuation
+
+# Transcriptions typiques renvoyées par la reconnaissance vocale (sans ponctuation)
+SAMPLE_TRANSCRIPTIONS = [
+    "bonjour oracle",
+    "quel est mon avenir",
+    "est-ce que je vais trouver l'amour cette année",
+    "je voudrais changer de travail mais j'ai peur",
+    "vois-tu quelque chose dans mon destin",
+    "pourquoi est-ce que je rêve toujours de la mer",
+    "j'ai perdu quelqu'un de cher et je ne sais plus quoi faire",
+    "qu'est-ce que les étoiles disent de moi",
+    # Pièges des règles locales : nom composé, « que » non interrogatif, conjonction en tête, « quoi » en fin
+    "je veux un rendez-vous",
+    "que la lumière soit",
+    "et alors",
+    "c est quoi mon avenir",
+]
+
+
+def time_calls(function, samples, repeat=1):
+    """Renvoie la liste des durées (ms) de function(sample), et les derniers résultats"""
+    durations = []
+    results = []
+    for _ in range(repeat):
+        results = []
+        for sample in samples:
+            start = time.perf_counter()
+            results.append(function(sample))
+            durations.append((time.perf_counter() - start) * 1000)
+    return durations, results
+
+
+def report(name, durations):
+    print(f"{name:>8}: moyenne {statistics.mean(durations):9.3f} ms  "
+          f"médiane {statistics.median(durations):9.3f} ms  max {max(durations):9.3f} ms")
+
+
+def word_error_rate(reference, hypothesis):
+    """Taux d'erreur sur les mots (distance d'édition / nombre de mots de la référence)"""
+    ref = re.findall(r"\w+", reference.lower())
+    hyp = re.findall(r"\w+", hypothesis.lower())
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / max(len(ref), 1)
+
+
+def load_fixtures(directory):
+    """Charge les enregistrements <nom>.wav et leurs transcriptions de référence <nom>.txt"""
+    if not os.path.isdir(directory):
+        return []
+    import speech_recognition as sr
+    recognizer = sr.Recognizer()
+    fixtures = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".wav"):
+            continue
+        path = os.path.join(directory, name)
+        with sr.AudioFile(path) as source:
+            audio = recognizer.record(source)
+        reference = None
+        if os.path.exists(path[:-4] + ".txt"):
+            with open(path[:-4] + ".txt", encoding="utf-8") as f:
+                reference = f.read().strip()
+        fixtures.append((name, audio, reference))
+    return fixtures
+
+
+def transcribe_fixture(backend, audio, chunk=1024):
+    """Renvoie (texte, latence après la fin de la phrase, temps de décodage pendant la phrase) en secondes
+
+    Un backend à résultats partiels reçoit l'audio bloc par bloc comme depuis le micro :
+    seul finish() reste à attendre une fois la phrase terminée.
+    """
+    import speech_recognition as sr
+    feed_time = 0
+    try:
+        if backend.streaming:
+            data = audio.get_raw_data(convert_rate=backend.sample_rate, convert_width=2)
+            stream = backend.open_stream(backend.sample_rate)
+            start = time.perf_counter()
+            for i in range(0, len(data), chunk * 2):
+                stream.feed(data[i:i + chunk * 2])
+            feed_time = time.perf_counter() - start
+            start = time.perf_counter()
+            text = stream.finish()
+        else:
+            start = time.perf_counter()
+            text = backend.transcribe(audio)
+    except (sr.UnknownValueError, sr.RequestError):
+        text = ""
+    return text, time.perf_counter() - start, feed_time
+
+
+def bench_stt(args):
+    from SpeechBackends import make_backend
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"Aucun enregistrement .wav dans {args.fixtures}")
+        return
+
+    for name in args.backends:
+        params = {"model_path": args.vosk_model} if name == "vosk" else {}
+        try:
+            backend = make_backend(name, **params)
+            start = time.perf_counter()
+            backend.warm_up()
+            warm_up = time.perf_counter() - start
+        except Exception as e:
+            print(f"{name}: indisponible ({e})")
+            continue
+
+        print(f"=== Reconnaissance vocale : {name} ===")
+        print(f"  préchargement: {warm_up * 1000:.0f} ms")
+        latencies, errors, realtime = [], [], []
+        for fixture, audio, reference in fixtures:
+            text, latency, feed_time = transcribe_fixture(backend, audio)
+            latencies.append(latency * 1000)
+            duration = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+            if backend.streaming:
+                realtime.append(feed_time / duration)
+            line = f"  {fixture}: {latency * 1000:7.0f} ms  « {text} »"
+            if reference is not None:
+                errors.append(word_error_rate(reference, text))
+                line += f"  (WER {errors[-1]:.0%})"
+            print(line)
+        report("latence", latencies)
+        if errors:
+            print(f"     WER: moyenne {statistics.mean(errors):.1%}")
+        if realtime:
+            # Au-delà de 1, le décodage ne suit plus le micro en temps réel
+            print(f" décodage: {statistics.mean(realtime):.2f} × temps réel pendant la phrase")
+        print()
+
+
+def start_stand_in_portal(delay=0.0, failure_rate=0.0, seed=0):
+    """Serveur HTTP local qui imite /api/message du portail (latence et taux d'erreur 503 réglables)
+
+    Renvoie (serveur, messages reçus, compteur de connexions TCP ouvertes).
+    """
+    import http.server
+    import json
+    import random
+    import threading
+
+    received = []
+    connections = [0]
+    rng = random.Random(seed)
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Connexions persistantes (keep-alive)
+        disable_nagle_algorithm = True  # En-têtes et corps écrits séparément : évite l'ACK retardé
+
+        def setup(self):
+            connections[0] += 1
+            super().setup()
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            status = 503 if rng.random() < failure_rate else 200
+            if status == 200:
+                received.append(json.loads(body))
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, received, connections
+
+
+def bench_portal(args):
+    import requests
+    from MessageDispatcher import MessageDispatcher
+
+    server, received, connections = start_stand_in_portal(args.delay, args.failure_rate)
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/message"
+    messages = [("user", sample) for sample in SAMPLE_TRANSCRIPTIONS]
+    messages = (messages * (args.messages // len(messages) + 1))[:args.messages]
+
+    print(f"=== Envoi de {len(messages)} messages au portail local "
+          f"(latence {args.delay * 1000:.0f} ms, {args.failure_rate:.0%} d'erreurs 503) ===")
+
+    # Ancien fonctionnement : requests.post bloquant, une connexion par message, sans nouvelle tentative
+    def post(message):
+        try:
+            return requests.post(url, json={"type": message[0], "content": message[1], "audio_url": None}).status_code
+        except requests.RequestException:
+            return None
+    start = time.perf_counter()
+    blocking, statuses = time_calls(post, messages)
+    total = time.perf_counter() - start
+    report("bloquant", blocking)
+    print(f"          {sum(status == 200 for status in statuses)}/{len(messages)} livrés en {total:.2f} s, "
+          f"{connections[0]} connexions")
+
+    # Répartiteur : file non bloquante, session persistante, nouvelles tentatives
+    received.clear()
+    connections[0] = 0
+    dispatcher = MessageDispatcher(url, backoff=0.05)
+    start = time.perf_counter()
+    queued, _ = time_calls(lambda message: dispatcher.send(*message), messages)
+    dispatcher.flush(timeout=60)
+    total = time.perf_counter() - start
+    report("file", queued)
+    print(f"          {len(received)}/{len(messages)} livrés en {total:.2f} s, {connections[0]} connexions, "
+          f"{dispatcher.failed} en échec")
+    dispatcher.close()
+    server.shutdown()
+
+
+def bench_uploads(args):
+    import tempfile
+    from UploadSpool import UploadSpool, MockUploader
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Réponses audio factices, dont des répétitions (phrases préenregistrées, réponse de repli)
+        files = []
+        for i in range(args.responses):
+            path = os.path.join(directory, f"response_{i}.mp3")
+            with open(path, 'wb') as f:
+                f.write(f"audio {i % max(args.responses // 2, 1)}".encode() * 1000)
+            files.append(path)
+        spool_dir = os.path.join(directory, "spool")
+        delivered = []
+
+        print(f"=== {args.responses} réponses, uploader simulé à {args.delay * 1000:.0f} ms, {args.workers} workers ===")
+
+        # Hors ligne : les sons restent dans le spool
+        spool = UploadSpool(MockUploader(fail=True), lambda message, url: delivered.append((message, url)),
+                            directory=spool_dir, workers=args.workers, max_attempts=1)
+        for i, path in enumerate(files):
+            spool.submit(path, f"réponse {i}")
+        spool.close()
+        print(f"hors ligne : {len(delivered)} messages envoyés sans audio, "
+              f"{len([name for name in os.listdir(spool_dir) if name.endswith('.audio')])} sons dans le spool")
+
+        # Retour du réseau : reprise du spool, puis nouvelles réponses
+        delivered.clear()
+        uploader = MockUploader(delay=args.delay)
+        start = time.perf_counter()
+        spool = UploadSpool(uploader, lambda message, url: delivered.append((message, url)),
+                            directory=spool_dir, workers=args.workers)
+        submitted, _ = time_calls(lambda i: spool.submit(files[i], f"réponse {i}"), range(len(files)))
+        spool.close(timeout=60)
+        total = time.perf_counter() - start
+        report("submit", submitted)
+        stats = spool.stats()
+        print(f"en ligne : {len(uploader.uploads)} uploads pour {len(delivered)} messages en {total:.2f} s "
+              f"({stats['deduplicated']} doublons évités, {stats['pending']} en attente)")
+
+
+def bench_punctuation(args):
+    print("=== Ponctuation des transcriptions (par tour) ===")
+    local, results = time_calls(restore_punctuation, SAMPLE_TRANSCRIPTIONS, repeat=100)
+    report("local", local)
+
+    if args.llm:
+        import CONVERS
+        oracle = CONVERS.OracleAssistant(config_path=args.config)
+        llm, llm_results = time_calls(oracle.add_punctuation, SAMPLE_TRANSCRIPTIONS)
+        report("llm", llm)
+        print(f"Gain par tour (llm → local) : {statistics.mean(llm) - statistics.mean(local):.0f} ms")
+        results = [f"{a}  |  {b}" for a, b in zip(results, llm_results)]
+
+    print()
+    for result in results:
+        print(f"  {result}")
+
+
+# Modules lourds du serveur de conversation, chacun mesuré dans un interpréteur neuf
+STARTUP_MODULES = ["speech_recognition", "pygame", "openai", "gtts", "cloudinary", "requests", "numpy"]
+
+# Exécuté dans un interpréteur neuf : dernière ligne = durées en JSON
+IMPORT_PROBE = """
+import json, time
+start = time.perf_counter()
+__import__({module!r})
+print(json.dumps({{"import": time.perf_counter() - start}}))
+"""
+
+ASSISTANT_PROBE = """
+import json, time
+start = time.perf_counter()
+import CONVERS
+timings = {{"import CONVERS": time.perf_counter() - start}}
+if {config!r}:
+    start = time.perf_counter()
+    oracle = CONVERS.OracleAssistant({config!r})
+    timings["OracleAssistant()"] = time.perf_counter() - start
+    if {warm_up!r}:
+        for name, duration in oracle.warm_up().items():
+            timings["warm_up " + name] = duration
+    oracle.close()
+print(json.dumps(timings))
+"""
+
+
+def run_probe(code):
+    """Exécute une sonde dans un nouvel interpréteur ; renvoie ses durées, ou l'erreur"""
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        return None, lines[-1] if lines else f"code {result.returncode}"
+    return json.loads(result.stdout.strip().splitlines()[-1]), None
+
+
+def bench_startup(args):
+    print(f"=== Démarrage à froid ({args.repeat} interpréteurs neufs par mesure) ===")
+    for module in STARTUP_MODULES:
+        durations = []
+        for _ in range(args.repeat):
+            timings, error = run_probe(IMPORT_PROBE.format(module=module))
+            if error:
+                print(f"import {module}: indisponible ({error})")
+                break
+            durations.append(timings["import"] * 1000)
+        if durations:
+            report(f"import {module}", durations)
+
+    config = args.config if os.path.exists(args.config) else ""
+    if not config:
+        print(f"\n(Pas de configuration {args.config} : OracleAssistant() non mesuré)")
+    samples = {}
+    for _ in range(args.repeat):
+        timings, error = run_probe(ASSISTANT_PROBE.format(config=config, warm_up=args.warm_up))
+        if error:
+            print(f"CONVERS: indisponible ({error})")
+            return
+        for name, duration in timings.items():
+            samples.setdefault(name, []).append(duration * 1000)
+    print()
+    for name, durations in samples.items():
+        report(name, durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai du pipeline de conversation")
+    parser.add_argument("--config", default=".secrets/.api_config.json")
+    subparsers = parser.add_subparsers(dest="bench", required=True)
+
+    punctuation = subparsers.add_parser("punctuation", help="Ponctuation locale contre appel GPT")
+    punctuation.add_argument("--llm", action="store_true", help="Mesure aussi le mode llm (clé API requise)")
+    punctuation.set_defaults(run=bench_punctuation)
+
+    stt = subparsers.add_parser("stt", help="Latence et précision des backends de reconnaissance vocale")
+    stt.add_argument("--fixtures", default="fixtures/stt", help="Répertoire des .wav et de leurs .txt de référence")
+    stt.add_argument("--backends", nargs="+", default=["google", "vosk"])
+    stt.add_argument("--vosk-model", default="models/vosk-model-small-fr-0.22")
+    stt.set_defaults(run=bench_stt)
+
+    portal = subparsers.add_parser("portal", help="Envoi des messages au portail (serveur local de substitution)")
+    portal.add_argument("--messages", type=int, default=50)
+    portal.add_argument("--delay", type=float, default=0.05, help="Latence simulée du portail (s)")
+    portal.add_argument("--failure-rate", type=float, default=0.1, help="Proportion de réponses 503")
+    portal.set_defaults(run=bench_portal)
+
+    uploads = subparsers.add_parser("uploads", help="Spool d'upload avec un uploader simulé (hors ligne)")
+    uploads.add_argument("--responses", type=int, default=40)
+    uploads.add_argument("--delay", type=float, default=0.2, help="Durée simulée d'un upload (s)")
+    uploads.add_argument("--workers", type=int, default=2)
+    uploads.set_defaults(run=bench_uploads)
+
+    startup = subparsers.add_parser("startup", help="Imports et initialisation de l'assistant à froid")
+    startup.add_argument("--repeat", type=int, default=3)
+    startup.add_argument("--warm-up", action="store_true",
+                         help="Mesure aussi OracleAssistant.warm_up() (réseau, clé API requise)")
+    startup.set_defaults(run=bench_startup)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()